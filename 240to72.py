@@ -1,74 +1,279 @@
+import argparse
+import glob
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def resample_bvh(input_file, output_file, original_fps=240, target_fps=72):
+from bvh_io import CACHE_DIR_NAME, BVHReader
+from bvh_resample import resample_bvh_interp
+
+
+def _resample_indices(num_frames, ratio):
     """
-    BVH файлын FPS-ийг өөрчлөх (жишээ: 240 fps → 72 fps)
+    Сонгох frame-ийн индексүүдийг өсөх дарааллаар, давхардалгүй үүсгэх
+
+    i * ratio монотон өсдөг тул жагсаалт хадгалалгүй lazy байдлаар гаргана.
     """
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
-
-    # HIERARCHY хэсгийг олох
-    motion_index = 0
-    for i, line in enumerate(lines):
-        if line.strip().startswith('MOTION'):
-            motion_index = i
+    last_idx = -1
+    for i in range(num_frames):
+        target_frame = i * ratio
+        if target_frame >= num_frames:
             break
+        idx = int(round(target_frame))
+        if idx < num_frames and idx != last_idx:
+            yield idx
+            last_idx = idx
 
-    # Header хэсэг (HIERARCHY + MOTION мэдээлэл)
-    header = lines[:motion_index + 3]  # MOTION, Frames, Frame Time хүртэл
 
-    # Frame Time өөрчлөх
-    frame_time = 1.0 / target_fps
-    header[-1] = f'Frame Time: {frame_time:.6f}\n'
+def resample_bvh(input_file, output_file, original_fps=240, target_fps=72, verbose=True):
+    """
+    BVH файлын FPS-ийг өөрчлөх (жишээ: 240 fps → 72 fps)
 
-    # Motion data хэсэг
-    motion_data = lines[motion_index + 3:]
+    Эх файлыг урсгалаар нэг удаа уншиж, сонгосон frame-үүдийг шууд бичнэ.
+    Returns: (эх frame-ийн тоо, шинэ frame-ийн тоо)
+    """
+    with BVHReader(input_file) as reader:
+        num_frames = reader.num_frames
 
-    # Resample ratio
-    ratio = original_fps / target_fps  # 240 / 72 = 3.333...
+        # Resample ratio
+        ratio = original_fps / target_fps  # 240 / 72 = 3.333...
 
-    # Шинэ frame-үүд сонгох
-    new_frames = []
-    frame_indices = []
+        # Шинэ frame-ийн тоо (header-т эхэлж бичих шаардлагатай)
+        new_count = sum(1 for _ in _resample_indices(num_frames, ratio))
 
-    for i in range(len(motion_data)):
-        target_frame = i * ratio
-        if target_frame < len(motion_data):
-            frame_indices.append(int(round(target_frame)))
+        # Frame Time өөрчлөх
+        frame_time = 1.0 / target_fps
 
-    # Давхардсан index арилгах
-    frame_indices = sorted(list(set(frame_indices)))
+        # Файл бичих
+        with open(output_file, 'w') as f:
+            # Header хэсэг (HIERARCHY + MOTION мэдээлэл)
+            f.writelines(reader.header_lines)
+            f.write(f'Frames: {new_count}\n')
+            f.write(f'Frame Time: {frame_time:.6f}\n')
 
-    # Frame-үүдийг сонгох
-    for idx in frame_indices:
-        if idx < len(motion_data):
-            new_frames.append(motion_data[idx])
+            # Frame-үүдийг сонгох
+            targets = _resample_indices(num_frames, ratio)
+            next_idx = next(targets, None)
+            for i, line in enumerate(reader.iter_frame_lines()):
+                if next_idx is None:
+                    break
+                if i == next_idx:
+                    f.write(line)
+                    next_idx = next(targets, None)
 
-    # Шинэ frame тоог засах
-    header[-2] = f'Frames: {len(new_frames)}\n'
+    if verbose:
+        print(f"✅ Хөрвүүлсэн: {os.path.basename(input_file)}")
+        print(f"   Эхний frames: {num_frames} → Шинэ frames: {new_count}\n")
+    return num_frames, new_count
 
-    # Файл бичих
-    with open(output_file, 'w') as f:
-        f.writelines(header)
-        f.writelines(new_frames)
 
-    print(f"✅ Хөрвүүлсэн: {os.path.basename(input_file)}")
-    print(f"   Эхний frames: {len(motion_data)} → Шинэ frames: {len(new_frames)}\n")
+def _stamp_path(output_path):
+    return os.path.join(os.path.dirname(output_path) or '.', CACHE_DIR_NAME,
+                        os.path.basename(output_path) + '.resample.json')
 
 
-# ==== 🧩 Batch хөрвүүлэлт ====
-input_folder = "BVH_FILES"
-output_folder = os.path.join(input_folder, "converted")
+def _stamp(input_path, output_path, params):
+    """Гаралтыг аль эх файлаас, ямар параметрээр үүсгэснийг тэмдэглэх dict"""
+    source, output = os.stat(input_path), os.stat(output_path)
+    return {
+        'source': os.path.abspath(input_path),
+        'source_size': source.st_size,
+        'source_mtime_ns': source.st_mtime_ns,
+        'output_size': output.st_size,
+        'output_mtime_ns': output.st_mtime_ns,
+        'params': params,
+    }
+
+
+def _is_up_to_date(input_path, output_path, params):
+    """
+    Гаралт нь энэ эх файлаас ижил параметрээр үүссэн бол дахин хөрвүүлэх шаардлагагүй
+
+    Тэмдэг нь эх ба гаралтын файлын хэмжээ, mtime-г агуулах тул аль нэг нь
+    өөрчлөгдсөн эсвэл --src-fps/--dst-fps/--method өөр бол дахин хөрвүүлнэ.
+    """
+    try:
+        with open(_stamp_path(output_path), 'r') as f:
+            return json.load(f) == _stamp(input_path, output_path, params)
+    except (OSError, ValueError):
+        return False
+
+
+def _save_stamp(input_path, output_path, params):
+    stamp_path = _stamp_path(output_path)
+    try:
+        os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+        tmp_path = stamp_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(_stamp(input_path, output_path, params), f)
+        os.replace(tmp_path, stamp_path)
+    except OSError as e:
+        print(f"⚠️  {stamp_path} хадгалж чадсангүй ({e})")
+
+
+def _resample_job(job):
+    """Process pool-д ажиллах нэг файлын хөрвүүлэлт"""
+    input_path, output_path, params = job
+    start = time.perf_counter()
+    # Дуусаагүй гаралт шинэчлэгдсэн мэт үлдэхгүйн тулд түр файлд бичиж солино
+    tmp_path = output_path + '.tmp'
+    try:
+        if params['method'] == "interp":
+            num_frames, new_count = resample_bvh_interp(
+                input_path, tmp_path, params['original_fps'], params['target_fps'],
+                params['antialias'])
+        else:
+            num_frames, new_count = resample_bvh(
+                input_path, tmp_path, params['original_fps'], params['target_fps'],
+                verbose=False)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _save_stamp(input_path, output_path, params)
+    return input_path, num_frames, new_count, time.perf_counter() - start
 
-os.makedirs(output_folder, exist_ok=True)
 
-# Файлуудыг жагсаах
-bvh_files = sorted([f for f in os.listdir(input_folder) if f.lower().endswith(".bvh")])
+def collect_bvh_files(source):
+    """Хавтас эсвэл glob pattern-оос .bvh файлуудын эрэмбэлсэн жагсаалт"""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, f) for f in os.listdir(source)
+                      if f.lower().endswith(".bvh"))
+    return sorted(f for f in glob.glob(source, recursive=True)
+                  if f.lower().endswith(".bvh"))
+
+
+def source_root(source):
+    """
+    Хавтас эсвэл glob pattern-ийн wildcard-гүй эхний хэсэг (гаралтын бүтцийн суурь)
+
+    "raw/**/*.bvh" -> "raw", "raw/shot[12].bvh" -> "raw"
+    """
+    if os.path.isdir(source):
+        return source
+    parts = []
+    for part in source.replace(os.sep, '/').split('/'):
+        if part != glob.escape(part):
+            break
+        parts.append(part)
+    else:
+        # Wildcard-гүй нэг файл
+        return os.path.dirname(source)
+    root = '/'.join(parts)
+    if not root:
+        root = '/' if source.startswith('/') else '.'
+    return root
+
+
+def batch_resample(input_files, output_folder, original_fps=240, target_fps=72,
+                   workers=None, force=False, method="nearest", antialias=True,
+                   input_root=None):
+    """
+    Олон BVH файлыг process pool ашиглан зэрэг хөрвүүлэх
+
+    Parameters:
+    -----------
+    input_files : list of str
+    output_folder : str
+    workers : int
+        Process-ийн тоо (None бол CPU-ийн тоо)
+    force : bool
+        True бол шинэчлэгдсэн гаралтыг ч дахин хөрвүүлнэ
+    method : str
+        "nearest" - ойр frame сонгох (мөрийг хэвээр хуулна)
+        "interp" - position/slerp interpolation (bvh_resample)
+    antialias : bool
+        "interp" үед FPS буурахад low-pass шүүлтүүр хэрэглэх эсэх
+    input_root : str, optional
+        Өгвөл файл бүрийн энэ хавтаснаас харьцангуй замыг output_folder
+        дотор хадгална (дэд хавтаснуудын ижил нэртэй файлууд давхцахгүй).
+        Өгөөгүй бол файлын нэрээр; ижил нэр давхцвал ValueError.
+    """
+    output_folder_abs = os.path.abspath(output_folder)
+    output_paths = {}
+    for input_path in input_files:
+        if os.path.abspath(input_path).startswith(output_folder_abs + os.sep):
+            continue  # Өмнөх гаралтыг дахин хөрвүүлэхгүй
+        if input_root is None:
+            relative = os.path.basename(input_path)
+        else:
+            relative = os.path.relpath(input_path, input_root)
+        output_path = os.path.join(output_folder, relative)
+        if output_path in output_paths:
+            raise ValueError(f"{input_path}, {output_paths[output_path]}: "
+                             f"ижил гаралт {output_path}")
+        output_paths[output_path] = input_path
+    input_files = list(output_paths.values())
+
+    # antialias нь зөвхөн "interp"-д нөлөөлнө
+    params = {'original_fps': original_fps, 'target_fps': target_fps, 'method': method,
+              'antialias': antialias if method == "interp" else None}
+    jobs = []
+    skipped = 0
+    for output_path, input_path in output_paths.items():
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if not force and _is_up_to_date(input_path, output_path, params):
+            skipped += 1
+            continue
+        jobs.append((input_path, output_path, params))
+
+    print(f"📂 {len(input_files)} файл: {len(jobs)} хөрвүүлэх, {skipped} шинэчлэгдсэн (алгасав)")
+    if not jobs:
+        return
+
+    total_bytes = sum(os.path.getsize(job[0]) for job in jobs)
+    total_frames = 0
+    failed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_resample_job, job): job for job in jobs}
+        for i, future in enumerate(as_completed(futures), start=1):
+            input_path = futures[future][0]
+            try:
+                _, num_frames, new_count, elapsed = future.result()
+            except (OSError, ValueError) as e:
+                failed += 1
+                print(f"⚠️  [{i}/{len(jobs)}] {os.path.basename(input_path)}: {e}")
+                continue
+            total_frames += num_frames
+            print(f"✅ [{i}/{len(jobs)}] {os.path.basename(input_path):<30} "
+                  f"{num_frames} → {new_count} frames  {elapsed:.2f} сек")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n🎉 {len(jobs) - failed}/{len(jobs)} файл {elapsed:.2f} секундэд хөрвүүлэгдлээ")
+    print(f"   Хурд: {total_frames / elapsed:.0f} frames/сек, "
+          f"{total_bytes / elapsed / 1e6:.1f} MB/сек")
+
+
+# ==== 🧩 Batch хөрвүүлэлт ====
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="BVH файлуудын FPS-ийг batch-аар өөрчлөх")
+    arg_parser.add_argument("input", nargs="?", default="BVH_FILES",
+                            help="Оролтын хавтас эсвэл glob pattern (default: BVH_FILES)")
+    arg_parser.add_argument("-o", "--output", default=None,
+                            help="Гаралтын хавтас (default: <input>/converted)")
+    arg_parser.add_argument("--src-fps", type=float, default=240)
+    arg_parser.add_argument("--dst-fps", type=float, default=72)
+    arg_parser.add_argument("-j", "--workers", type=int, default=None,
+                            help="Process-ийн тоо (default: CPU-ийн тоо)")
+    arg_parser.add_argument("--force", action="store_true",
+                            help="Шинэчлэгдсэн гаралтыг ч дахин хөрвүүлэх")
+    arg_parser.add_argument("--method", choices=["nearest", "interp"], default="nearest",
+                            help="nearest: ойр frame сонгох, interp: slerp interpolation")
+    arg_parser.add_argument("--no-antialias", action="store_true",
+                            help="interp үед low-pass шүүлтүүрийг унтраах")
+    args = arg_parser.parse_args()
 
-# Эхний 19-г хөрвүүлэх
-for i, filename in enumerate(bvh_files[:19], start=1):
-    input_path = os.path.join(input_folder, filename)
-    output_path = os.path.join(output_folder, filename)
-    resample_bvh(input_path, output_path, original_fps=240, target_fps=72)
+    output_folder = args.output
+    if output_folder is None:
+        output_folder = os.path.join(source_root(args.input), "converted")
 
-print("🎉 Бүх 19 BVH файл амжилттай хөрвүүлэгдлээ!")
+    batch_resample(collect_bvh_files(args.input), output_folder,
+                   args.src_fps, args.dst_fps, args.workers, args.force,
+                   args.method, not args.no_antialias,
+                   input_root=source_root(args.input))
@@ -4,6 +4,8 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import math
 
+from bvh_fk import SkeletonPlan, forward_kinematics
+
 # --- 1. BVH файл унших ---
 with open("shot1_004_Skeleton_002.bvh") as f:
     mocap = Bvh(f.read())
@@ -20,88 +22,65 @@ for j in joints:
     joint_channels_idx[j] = list(range(idx, idx + len(channels)))
     idx += len(channels)
 
-# parent dictionary, ROOT-г None
-joint_parents = {}
-
-def build_parents(node, parent=None):
-    # End Site эсэхийг шалгах
-    try:
-        name = node.name  # ROOT, JOINT-д ажиллана
-    except IndexError:
-        # End Site-д нэр өгөх
-        name = "EndSite_" + (parent if parent else "ROOT")
-    joint_parents[name] = parent
-
-    # JOINT-г traverse хийх
-    for child in node.filter('JOINT'):
-        build_parents(child, name)
-    
-    # End Site-г traverse хийх
-    for child in node.filter('End'):
-        build_parents(child, name)
-
-# ROOT node-оос эхлэх
-build_parents(mocap.root)
-
-
-# --- 3. Helper: rotation matrix ---
-def rot_matrix_xyz(rx, ry, rz):
-    # Degrees to radians
-    rx, ry, rz = np.deg2rad([rx, ry, rz])
-    Rx = np.array([[1,0,0],
-                   [0,np.cos(rx), -np.sin(rx)],
-                   [0,np.sin(rx), np.cos(rx)]])
-    Ry = np.array([[np.cos(ry),0,np.sin(ry)],
-                   [0,1,0],
-                   [-np.sin(ry),0,np.cos(ry)]])
-    Rz = np.array([[np.cos(rz), -np.sin(rz),0],
-                   [np.sin(rz), np.cos(rz),0],
-                   [0,0,1]])
-    return Rz @ Ry @ Rx
+# --- 3. Skeleton plan: channel-ийн байршлыг нэг удаа шийдэх ---
+def build_plan(root):
+    names, parents, offsets = [], [], []
+    position_cols, rotation_cols, rotation_axes = [], [], []
+    end_sites = []
 
-# --- 4. Global joint positions ---
-def get_global_positions(frame_idx):
-    positions = {}
-    def traverse(node, parent_pos=np.zeros(3), parent_rot=np.eye(3)):
+    def visit(node, parent_idx):
+        current_idx = len(names)
         name = node.name
         channels = mocap.joint_channels(name)
         indices = joint_channels_idx[name]
-        pos = np.array([0,0,0])
-        rot = np.eye(3)
-
-        if 'Xposition' in channels:
-            xi = indices[channels.index('Xposition')]
-            yi = indices[channels.index('Yposition')]
-            zi = indices[channels.index('Zposition')]
-            pos = np.array([frames_data[frame_idx, xi],
-                            frames_data[frame_idx, yi],
-                            frames_data[frame_idx, zi]])
-        # Rotation
-        rot_idx = []
-        for c in ['Xrotation','Yrotation','Zrotation']:
+        names.append(name)
+        parents.append(parent_idx)
+        offsets.append(np.array(node['OFFSET'], dtype=float))
+
+        pos_cols = [-1, -1, -1]
+        for axis, c in enumerate(['Xposition', 'Yposition', 'Zposition']):
             if c in channels:
-                rot_idx.append(indices[channels.index(c)])
-            else:
-                rot_idx.append(None)
-        rx = frames_data[frame_idx, rot_idx[0]] if rot_idx[0] is not None else 0
-        ry = frames_data[frame_idx, rot_idx[1]] if rot_idx[1] is not None else 0
-        rz = frames_data[frame_idx, rot_idx[2]] if rot_idx[2] is not None else 0
-        rot = rot_matrix_xyz(rx, ry, rz)
-
-        # End Site offset
-        offset = np.array(node['OFFSET'], dtype=float)
-        global_pos = parent_pos + parent_rot @ (pos + offset)
-        positions[name] = global_pos
-
-        # Traverse children
+                pos_cols[axis] = indices[channels.index(c)]
+        position_cols.append(pos_cols)
+
+        # Эргэлт: Rz @ Ry @ Rx дараалал (channel-ийн дарааллаас үл хамаарна)
+        rot_cols, rot_axes = [], []
+        for axis, c in [(2, 'Zrotation'), (1, 'Yrotation'), (0, 'Xrotation')]:
+            if c in channels:
+                rot_cols.append(indices[channels.index(c)])
+                rot_axes.append(axis)
+        rotation_cols.append(rot_cols + [-1] * (3 - len(rot_cols)))
+        rotation_axes.append(rot_axes + [-1] * (3 - len(rot_axes)))
+
         for child in node.filter('JOINT'):
-            traverse(child, global_pos, parent_rot @ rot)
+            visit(child, current_idx)
         for child in node.filter('End'):
-            offset_end = np.array(child['OFFSET'], dtype=float)
-            positions[child.name] = global_pos + parent_rot @ rot @ offset_end
+            end_sites.append(len(names))
+            names.append("EndSite_" + name)
+            parents.append(current_idx)
+            offsets.append(np.array(child['OFFSET'], dtype=float))
+            position_cols.append([-1, -1, -1])
+            rotation_cols.append([-1, -1, -1])
+            rotation_axes.append([-1, -1, -1])
 
-    traverse(mocap.root)
-    return positions
+    visit(root, -1)
+    return SkeletonPlan(names, parents, offsets, position_cols, rotation_cols,
+                        rotation_axes, end_sites, idx)
+
+# mocap.root нь HIERARCHY-г агуулсан сав тул ROOT joint-оос эхэлнэ
+plan = build_plan(next(mocap.root.filter('ROOT')))
+
+# ROOT-ийн position channel нь OFFSET дээр нэмэгддэг тул бүх skeleton-г шилжүүлнэ
+root_shift = plan.offsets[0] if (plan.position_cols[0] >= 0).all() else np.zeros(3)
+
+# --- 4. Global joint positions ---
+def get_global_positions(frame_idx, joints=None):
+    """
+    (joints, 3) world байрлалууд, plan.names-ийн дарааллаар
+
+    joints өгвөл зөвхөн тэдгээрийг (өвөг гинжээр нь) тооцно.
+    """
+    return forward_kinematics(plan, frames_data[frame_idx], joints=joints)[0] + root_shift
 
 # --- 5. Matplotlib animation ---
 fig, ax = plt.subplots(figsize=(8,12))
@@ -114,16 +93,6 @@ ax.axis('off')
 frame_step = 10  # frame-г алгасаж хурдан
 lines = []
 
-# Connect joints: skeletal structure
-connections = []
-def build_connections(node):
-    for child in node.filter('JOINT'):
-        connections.append((node.name, child.name))
-        build_connections(child)
-    for child in node.filter('End'):
-        connections.append((node.name, child.name))
-build_connections(mocap.root)
-
 def update(frame_idx):
     ax.clear()
     ax.set_facecolor('white')
@@ -133,14 +102,10 @@ def update(frame_idx):
     ax.axis('off')
 
     positions = get_global_positions(frame_idx)
-    xs, ys = [], []
-    for p in positions.values():
-        xs.append(p[0])
-        ys.append(p[1])
-    ax.scatter(xs, ys, s=20, color='black')
+    ax.scatter(positions[:, 0], positions[:, 1], s=20, color='black')
 
     # Draw bones
-    for c in connections:
+    for c in plan.connections:
         p1 = positions[c[0]]
         p2 = positions[c[1]]
         ax.plot([p1[0], p2[0]], [p1[1], p2[1]], color='black', linewidth=2)
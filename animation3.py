@@ -3,30 +3,50 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import os
 
+from bvh_io import BVHReader, load_cached_motion, save_cached_motion
+from bvh_bounds import clip_bounds
+from bvh_fk import SkeletonPlan, forward_kinematics
+from bvh_resample import sample_positions
+from render_utils import FigureRenderer, open_video_writer, render_frames
+
 class BVHParser:
-    def __init__(self, filename):
+    def __init__(self, filename, dtype=np.float64):
         self.filename = filename
+        self.dtype = dtype
         self.joints = {}
         self.joint_names = []
         self.hierarchy = []
-        self.frames = []
+        self.frames = np.empty((0, 0), dtype=dtype)
         self.frame_time = 0
         self.root = None
-        
-    def parse(self):
-        with open(self.filename, 'r') as f:
-            lines = f.readlines()
+        self.plan = None
+        
+    def parse(self, use_cache=True):
+        # Өмнө нь уншсан бол motion-г кэшээс memory-map хийнэ
+        cached = load_cached_motion(self.filename, self.dtype) if use_cache else None
+        if cached is not None:
+            lines, self.frame_time, self.frames = cached
+        else:
+            # Толгойг мөрөөр, motion-г нэг дор массив болгон урсгалаар унших
+            with BVHReader(self.filename) as reader:
+                lines = reader.hierarchy_lines
+                self.frame_time = reader.frame_time
+                self.frames = reader.read_motion(self.dtype)
         
         i = 0
         while i < len(lines):
             line = lines[i].strip()
             if line.startswith('ROOT'):
                 self.root, i = self._parse_joint(lines, i, None)
-            elif line.startswith('MOTION'):
-                i = self._parse_motion(lines, i)
             else:
                 i += 1
         
+        if use_cache and cached is None:
+            save_cached_motion(self.filename, lines, self.frame_time, self.frames)
+        
+        # Channel-ийн байршлыг нэг удаа шийдэж FK-д зориулж хадгалах.
+        # Энэ файлд эргэлтүүдийг offset-ийн өмнө үржүүлдэг (rotate_offsets)
+        self.plan = SkeletonPlan.from_root(self.root, rotate_offsets=True)
         return self
     
     def _parse_joint(self, lines, idx, parent):
@@ -94,97 +114,65 @@ class BVHParser:
                 
         return joint, idx
     
-    def _parse_motion(self, lines, idx):
-        idx += 1
-        while idx < len(lines):
-            line = lines[idx].strip()
-            if line.startswith('Frames:'):
-                num_frames = int(line.split(':')[1].strip())
-                idx += 1
-            elif line.startswith('Frame Time:'):
-                self.frame_time = float(line.split(':')[1].strip())
-                idx += 1
-                break
-            else:
-                idx += 1
-        
-        # Parse frame data
-        while idx < len(lines):
-            line = lines[idx].strip()
-            if line:
-                values = [float(x) for x in line.split()]
-                self.frames.append(values)
-            idx += 1
-            
-        return idx
-    
     def get_skeleton_points(self, frame_idx):
         if frame_idx >= len(self.frames):
             frame_idx = len(self.frames) - 1
-            
-        frame_data = self.frames[frame_idx]
-        points = []
-        
-        channel_idx = 0
-        transforms = {}
-        
-        def process_joint(joint, parent_transform):
-            nonlocal channel_idx
-            
-            offset = np.array(joint['offset'])
-            local_transform = np.eye(4)
-            local_transform[:3, 3] = offset
-            
-            if joint['channels']:
-                for channel in joint['channels']:
-                    if channel_idx < len(frame_data):
-                        value = frame_data[channel_idx]
-                        channel_idx += 1
-                        
-                        if 'position' in channel:
-                            axis = channel[0].lower()
-                            if axis == 'x':
-                                local_transform[0, 3] = value
-                            elif axis == 'y':
-                                local_transform[1, 3] = value
-                            elif axis == 'z':
-                                local_transform[2, 3] = value
-                                
-                        elif 'rotation' in channel:
-                            angle = np.radians(value)
-                            axis = channel[0].lower()
-                            
-                            if axis == 'x':
-                                rot = np.array([[1, 0, 0],
-                                              [0, np.cos(angle), -np.sin(angle)],
-                                              [0, np.sin(angle), np.cos(angle)]])
-                            elif axis == 'y':
-                                rot = np.array([[np.cos(angle), 0, np.sin(angle)],
-                                              [0, 1, 0],
-                                              [-np.sin(angle), 0, np.cos(angle)]])
-                            elif axis == 'z':
-                                rot = np.array([[np.cos(angle), -np.sin(angle), 0],
-                                              [np.sin(angle), np.cos(angle), 0],
-                                              [0, 0, 1]])
-                            
-                            rot4 = np.eye(4)
-                            rot4[:3, :3] = rot
-                            local_transform = rot4 @ local_transform
-            
-            world_transform = parent_transform @ local_transform
-            transforms[joint['name']] = world_transform
-            
-            world_pos = world_transform[:3, 3]
-            points.append(world_pos)
-            
-            for child in joint['children']:
-                process_joint(child, world_transform)
-        
-        process_joint(self.root, np.eye(4))
-        
-        return np.array(points)
+        return forward_kinematics(self.plan, self.frames[frame_idx])[0]
 
-def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=30):
+    def get_skeleton_points_at(self, i0, i1, w):
+        """Хоёр frame-ийн цэгүүдийг (1 - w) : w харьцаагаар холих"""
+        if w == 0 or i1 == i0:
+            return self.get_skeleton_points(i0)
+        p0, p1 = forward_kinematics(self.plan, self.frames[[i0, i1]])
+        return p0 + w * (p1 - p0)
+
+    def get_skeleton_at_fps(self, fps):
+        """
+        fps-ийн агшин бүр дэх цэгүүд (FK гаралтыг interpolation)
+        
+        Зөвхөн шаардлагатай эх frame-үүдийн FK-г batch хийж хөрш хоёр
+        frame-ийн байрлалыг шугаманаар холино.
+        
+        Returns: ((n, joints, 3) байрлал, (n,) эх frame-ийн бутархай индекс)
+        """
+        i0, i1, w = sample_positions(len(self.frames), 1.0 / self.frame_time, fps)
+        needed, inverse = np.unique(np.concatenate([i0, i1]), return_inverse=True)
+        positions = forward_kinematics(self.plan, np.asarray(self.frames[needed], dtype=float))
+        p0 = positions[inverse[:len(i0)]]
+        p1 = positions[inverse[len(i0):]]
+        return p0 + w[:, np.newaxis, np.newaxis] * (p1 - p0), i0 + w
+
+    def get_bounds(self):
+        """
+        Бүх frame-ийн цэгүүдийн тэнхлэг бүрийн яг min/max
+
+        Энэ файлын FK хэвшил өөр тул .bvh_cache-ийн bounds-ийг ашиглахгүй.
+        Returns: (lo, hi) тус бүр (3,) массив
+        """
+        return clip_bounds(self.filename, plan=self.plan, motion=self.frames, use_cache=False)
+
+class PointCloudRenderer(FigureRenderer):
+    """Joint-уудыг хар цэгээр зурах"""
+    
+    def __init__(self, xlim, ylim, zlim, alpha=0.6, blit=True, backend='matplotlib'):
+        self.alpha = alpha
+        super().__init__(xlim, ylim, zlim, blit=blit, backend=backend)
+    
+    def style_axes(self, ax):
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        ax.set_zlabel('Z')
+    
+    def setup_artists(self, ax):
+        self.joints = ax.scatter([], [], [], c='black', marker='o', s=5, alpha=self.alpha)
+        return [self.joints, ax.title]
+    
+    def update_artists(self, points, title):
+        self.joints._offsets3d = (points[:, 0], points[:, 2], points[:, 1])
+        self.ax.title.set_text(title)
+
+def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=30, workers=1,
+                            backend='matplotlib'):
     try:
         import imageio
         use_imageio = True
@@ -201,64 +189,41 @@ def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=
     print(f"Frames: {len(parser.frames)}")
     print(f"Frame time: {parser.frame_time}")
     
-    # Calculate frame skip
-    frame_skip = max(1, int((1.0 / parser.frame_time) / fps))
-    frames_to_render = range(0, len(parser.frames), frame_skip)
+    # Гаралтын frame бүрийн хугацаан дахь цэгүүдийг хөрш frame-үүдийн FK-аас
+    # interpolation хийнэ. Бүхэл skip-ээс ялгаатай нь видеоны үргэлжлэх
+    # хугацаа эх клиптэй тэнцүү.
+    all_points, frames_to_render = parser.get_skeleton_at_fps(fps)
     
     print(f"Нийт render хийх frames: {len(frames_to_render)}")
     
-    # Get all points to calculate limits
     print("Харьцаа тооцоолж байна...")
-    all_points = []
-    step = max(1, len(parser.frames) // 100)
-    for i in range(0, len(parser.frames), step):
-        pts = parser.get_skeleton_points(i)
-        all_points.extend(pts)
-    
-    all_points = np.array(all_points)
+    lo, hi = parser.get_bounds()
     margin = 20
-    xlim = [all_points[:, 0].min() - margin, all_points[:, 0].max() + margin]
-    ylim = [all_points[:, 1].min() - margin, all_points[:, 1].max() + margin]
-    zlim = [all_points[:, 2].min() - margin, all_points[:, 2].max() + margin]
+    xlim = [lo[0] - margin, hi[0] + margin]
+    ylim = [lo[1] - margin, hi[1] + margin]
+    zlim = [lo[2] - margin, hi[2] + margin]
+    
+    # Worker бүр Figure-г нэг удаа үүсгэж frame бүрт зөвхөн өгөгдлийг шинэчилнэ
+    renderer_kwargs = dict(xlim=xlim, ylim=ylim, zlim=zlim,
+                           alpha=0.6 if use_imageio else 1, backend=backend)
+    items = ((points, f'Frame {frame:.0f}/{len(parser.frames)}')
+             for points, frame in zip(all_points, frames_to_render))
+    images = render_frames(items, PointCloudRenderer, renderer_kwargs, workers=workers)
     
     if use_imageio:
-        # Create video using imageio
-        images = []
-        
-        for idx, frame in enumerate(frames_to_render):
-            if idx % 50 == 0:
-                print(f"Progress: {idx}/{len(frames_to_render)}")
-            
-            fig = plt.figure(figsize=(10, 8))
-            ax = fig.add_subplot(111, projection='3d')
-            
-            points = parser.get_skeleton_points(frame)
-            
-            ax.scatter(points[:, 0], points[:, 2], points[:, 1], 
-                      c='black', marker='o', s=5, alpha=0.6)
-            
-            ax.set_xlim(xlim)
-            ax.set_ylim(zlim)
-            ax.set_zlim(ylim)
-            ax.view_init(elev=10, azim=90)
-            
-            ax.set_xlabel('X')
-            ax.set_ylabel('Y')
-            ax.set_zlabel('Z')
-            ax.set_title(f'Frame {frame}/{len(parser.frames)}')
-            
-            # Convert to image
-            fig.canvas.draw()
-            image = np.frombuffer(fig.canvas.buffer_rgba(), dtype='uint8')
-            image = image.reshape(fig.canvas.get_width_height()[::-1] + (4,))
-            image = image[:, :, :3]  # Remove alpha channel
-            images.append(image)
-            
-            plt.close(fig)
+        # Create video using imageio: frame бүрийг санах ойд цуглуулалгүй
+        # шууд encoder руу бичнэ
+        writer, saved_file = open_video_writer(output_file, fps)
+        print(f"Video бичиж байна: {saved_file}")
+        
+        with writer:
+            for idx, image in enumerate(images):
+                if idx % 50 == 0:
+                    print(f"Progress: {idx}/{len(frames_to_render)}")
+                
+                writer.append_data(image)
         
-        print(f"Video хадгалж байна: {output_file}")
-        imageio.mimsave(output_file, images, fps=fps)
-        print(f"Амжилттай! Video хадгалагдлаа: {output_file}")
+        print(f"Амжилттай! Video хадгалагдлаа: {saved_file}")
         
     else:
         # Save individual frames
@@ -267,30 +232,11 @@ def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=
         
         print(f"Зургуудыг {output_dir}/ хавтасанд хадгалж байна...")
         
-        for idx, frame in enumerate(frames_to_render):
+        for idx, image in enumerate(images):
             if idx % 50 == 0:
                 print(f"Progress: {idx}/{len(frames_to_render)}")
             
-            fig = plt.figure(figsize=(10, 8))
-            ax = fig.add_subplot(111, projection='3d')
-            
-            points = parser.get_skeleton_points(frame)
-            
-            ax.scatter(points[:, 0], points[:, 2], points[:, 1], 
-                      c='black', marker='o', s=5, alpha=1)
-            
-            ax.set_xlim(xlim)
-            ax.set_ylim(zlim)
-            ax.set_zlim(ylim)
-            ax.view_init(elev=10, azim=90)
-            
-            ax.set_xlabel('X')
-            ax.set_ylabel('Y')
-            ax.set_zlabel('Z')
-            ax.set_title(f'Frame {frame}/{len(parser.frames)}')
-            
-            plt.savefig(f"{output_dir}/frame_{idx:05d}.png", dpi=100)
-            plt.close(fig)
+            plt.imsave(f"{output_dir}/frame_{idx:05d}.png", image)
         
         print(f"Амжилттай! {len(frames_to_render)} зураг хадгалагдлаа.")
         print(f"Video үүсгэхийн тулд FFmpeg суулгана уу:")
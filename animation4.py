@@ -1,32 +1,52 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 import os
 
+from bvh_bounds import clip_bounds
+from bvh_io import BVHReader, load_cached_motion, save_cached_motion
+from bvh_resample import sample_positions
+from bvh_fk import SkeletonPlan, forward_kinematics
+from render_utils import FigureRenderer, open_video_writer, render_frames
+
 class BVHParser:
-    def __init__(self, filename):
+    def __init__(self, filename, dtype=np.float64):
         self.filename = filename
+        self.dtype = dtype
         self.joints = {}
         self.joint_names = []
         self.hierarchy = []
-        self.frames = []
+        self.frames = np.empty((0, 0), dtype=dtype)
         self.frame_time = 0
         self.root = None
+        self.plan = None
         
-    def parse(self):
-        with open(self.filename, 'r') as f:
-            lines = f.readlines()
+    def parse(self, use_cache=True):
+        # Өмнө нь уншсан бол motion-г кэшээс memory-map хийнэ
+        cached = load_cached_motion(self.filename, self.dtype) if use_cache else None
+        if cached is not None:
+            lines, self.frame_time, self.frames = cached
+        else:
+            # Толгойг мөрөөр, motion-г нэг дор массив болгон урсгалаар унших
+            with BVHReader(self.filename) as reader:
+                lines = reader.hierarchy_lines
+                self.frame_time = reader.frame_time
+                self.frames = reader.read_motion(self.dtype)
         
         i = 0
         while i < len(lines):
             line = lines[i].strip()
             if line.startswith('ROOT'):
                 self.root, i = self._parse_joint(lines, i, None)
-            elif line.startswith('MOTION'):
-                i = self._parse_motion(lines, i)
             else:
                 i += 1
         
+        if use_cache and cached is None:
+            save_cached_motion(self.filename, lines, self.frame_time, self.frames)
+        
+        # Channel-ийн байршлыг нэг удаа шийдэж FK-д зориулж хадгалах
+        self.plan = SkeletonPlan.from_root(self.root)
         return self
     
     def _parse_joint(self, lines, idx, parent):
@@ -95,121 +115,84 @@ class BVHParser:
                 
         return joint, idx
     
-    def _parse_motion(self, lines, idx):
-        idx += 1
-        while idx < len(lines):
-            line = lines[idx].strip()
-            if line.startswith('Frames:'):
-                num_frames = int(line.split(':')[1].strip())
-                idx += 1
-            elif line.startswith('Frame Time:'):
-                self.frame_time = float(line.split(':')[1].strip())
-                idx += 1
-                break
-            else:
-                idx += 1
-        
-        # Parse frame data
-        while idx < len(lines):
-            line = lines[idx].strip()
-            if line:
-                values = [float(x) for x in line.split()]
-                self.frames.append(values)
-            idx += 1
-            
-        return idx
-    
     def get_skeleton_data(self, frame_idx):
         """Returns points and connections for the skeleton"""
         if frame_idx >= len(self.frames):
             frame_idx = len(self.frames) - 1
-            
-        frame_data = self.frames[frame_idx]
-        points = []
-        connections = []
-        joint_positions = {}
         
-        channel_idx = 0
+        points = forward_kinematics(self.plan, self.frames[frame_idx])[0]
+        return points, self.plan.connections
+    
+    def get_skeleton_batch(self, frame_indices=None, return_transforms=False, joints=None):
+        """
+        Олон frame-ийн skeleton-г нэг дор тооцох (batched FK)
+
+        frame_indices өгөөгүй бол бүх frame-ийг тооцно. joints (нэр эсвэл
+        индекс) өгвөл зөвхөн тэдгээрийн өвөг гинжийг тооцож, өгсөн
+        дарааллаар буцаана.
+        Returns: (frames, joints, 3) байрлал [, (frames, joints, 4, 4) transform]
+        """
+        motion = np.asarray(self.frames, dtype=float)
+        if frame_indices is not None:
+            motion = motion[frame_indices]
+        return forward_kinematics(self.plan, motion, return_transforms, joints)
+
+    def get_skeleton_at_fps(self, fps):
+        """
+        fps-ийн цаг хугацааны цэгүүд дэх skeleton (FK гаралтыг interpolation)
         
-        def process_joint(joint, parent_transform, parent_idx):
-            nonlocal channel_idx
-            
-            # Create local transform with offset
-            offset = np.array(joint['offset'])
-            local_transform = np.eye(4)
-            
-            # Apply rotations first, then translation
-            rotation_matrix = np.eye(4)
-            
-            if joint['channels']:
-                # Collect rotation values
-                rotations = {}
-                for channel in joint['channels']:
-                    if channel_idx < len(frame_data):
-                        value = frame_data[channel_idx]
-                        channel_idx += 1
-                        
-                        if 'position' in channel:
-                            axis = channel[0].lower()
-                            if axis == 'x':
-                                offset[0] = value
-                            elif axis == 'y':
-                                offset[1] = value
-                            elif axis == 'z':
-                                offset[2] = value
-                        elif 'rotation' in channel:
-                            rotations[channel[0].lower()] = np.radians(value)
-                
-                # Apply rotations in the order specified in channels
-                for channel in joint['channels']:
-                    if 'rotation' in channel:
-                        axis = channel[0].lower()
-                        if axis in rotations:
-                            angle = rotations[axis]
-                            
-                            if axis == 'x':
-                                rot = np.array([[1, 0, 0],
-                                              [0, np.cos(angle), -np.sin(angle)],
-                                              [0, np.sin(angle), np.cos(angle)]])
-                            elif axis == 'y':
-                                rot = np.array([[np.cos(angle), 0, np.sin(angle)],
-                                              [0, 1, 0],
-                                              [-np.sin(angle), 0, np.cos(angle)]])
-                            elif axis == 'z':
-                                rot = np.array([[np.cos(angle), -np.sin(angle), 0],
-                                              [np.sin(angle), np.cos(angle), 0],
-                                              [0, 0, 1]])
-                            
-                            rot4 = np.eye(4)
-                            rot4[:3, :3] = rot
-                            rotation_matrix = rotation_matrix @ rot4
-            
-            # Apply rotation then translation
-            local_transform = rotation_matrix
-            local_transform[:3, 3] = offset
-            
-            # Calculate world transform
-            world_transform = parent_transform @ local_transform
-            
-            # Get world position
-            world_pos = world_transform[:3, 3]
-            current_idx = len(points)
-            points.append(world_pos)
-            joint_positions[joint['name']] = current_idx
-            
-            # Add connection to parent
-            if parent_idx is not None:
-                connections.append((parent_idx, current_idx))
-            
-            # Process children
-            for child in joint['children']:
-                process_joint(child, world_transform, current_idx)
+        Зөвхөн шаардлагатай эх frame-үүдийн FK-г batch хийж хөрш хоёр
+        frame-ийн байрлалыг шугаманаар холино. Гаралтын үргэлжлэх хугацаа
+        эх клиптэй тэнцүү.
         
-        process_joint(self.root, np.eye(4), None)
+        Returns: ((n, joints, 3) байрлал, (n,) эх frame-ийн бутархай индекс)
+        """
+        i0, i1, w = sample_positions(len(self.frames), 1.0 / self.frame_time, fps)
+        needed, inverse = np.unique(np.concatenate([i0, i1]), return_inverse=True)
+        positions = self.get_skeleton_batch(needed)
+        p0 = positions[inverse[:len(i0)]]
+        p1 = positions[inverse[len(i0):]]
+        return p0 + w[:, np.newaxis, np.newaxis] * (p1 - p0), i0 + w
+    
+    def get_connections(self):
+        """Skeleton-ий ясны холболтууд (parent_idx, child_idx)"""
+        return self.plan.connections
+    
+    def get_bounds(self, percentile=None):
+        """
+        Бүх frame-ийн joint байрлалын тэнхлэг бүрийн хязгаар (кэштэй)
+        
+        percentile=None бол яг min/max, q бол [q, 100 - q] percentile.
+        Returns: (lo, hi) тус бүр (3,) массив
+        """
+        return clip_bounds(self.filename, percentile, plan=self.plan, motion=self.frames)
+
+class SkeletonRenderer(FigureRenderer):
+    """Ясыг цэнхэр шугам, joint-уудыг улаан цэгээр зурах"""
+    
+    def style_axes(self, ax):
+        ax.set_xlabel('X')
+        ax.set_ylabel('Z')
+        ax.set_zlabel('Y')
+    
+    def setup_artists(self, ax):
+        # Draw connections (bones): бүх ясыг нэг collection-оор
+        self.bones = Line3DCollection(np.zeros((len(self.connections), 2, 3)),
+                                      colors='b', linewidths=2, alpha=0.7)
+        ax.add_collection3d(self.bones)
         
-        return np.array(points), connections
+        # Draw joints
+        self.joints = ax.scatter([], [], [], c='red', marker='o', s=5, alpha=0.8)
+        return [self.bones, self.joints, ax.title]
+    
+    def update_artists(self, points, title):
+        xzy = points[:, [0, 2, 1]]
+        self.bones.set_segments(xzy[self.connections])
+        self.joints._offsets3d = (xzy[:, 0], xzy[:, 1], xzy[:, 2])
+        self.ax.title.set_text(title)
 
-def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=30):
+def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=30, workers=1,
+                            backend='matplotlib', bounds=None):
     try:
         import imageio
         use_imageio = True
@@ -226,78 +209,44 @@ def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=
     print(f"Frames: {len(parser.frames)}")
     print(f"Frame time: {parser.frame_time}")
     
-    # Calculate frame skip
-    frame_skip = max(1, int((1.0 / parser.frame_time) / fps))
-    frames_to_render = range(0, len(parser.frames), frame_skip)
+    # Гаралтын frame бүрийн хугацаан дахь pose-г хөрш frame-үүдийн FK-аас
+    # interpolation хийнэ. Бүхэл skip-ээс ялгаатай нь видеоны үргэлжлэх
+    # хугацаа эх клиптэй тэнцүү.
+    all_positions, frames_to_render = parser.get_skeleton_at_fps(fps)
+    connections = parser.get_connections()
     
     print(f"Нийт render хийх frames: {len(frames_to_render)}")
     
-    # Get all points to calculate limits
     print("Харьцаа тооцоолж байна...")
-    all_points = []
-    step = max(1, len(parser.frames) // 100)
-    for i in range(0, len(parser.frames), step):
-        pts, _ = parser.get_skeleton_data(i)
-        all_points.extend(pts)
     
-    all_points = np.array(all_points)
+    # bounds=(lo, hi) өгвөл (жишээ нь directory_bounds) олон видеог ижил хүрээтэй болгоно
+    lo, hi = parser.get_bounds() if bounds is None else bounds
     margin = 20
-    xlim = [all_points[:, 0].min() - margin, all_points[:, 0].max() + margin]
-    ylim = [all_points[:, 1].min() - margin, all_points[:, 1].max() + margin]
-    zlim = [all_points[:, 2].min() - margin, all_points[:, 2].max() + margin]
+    xlim = [lo[0] - margin, hi[0] + margin]
+    ylim = [lo[1] - margin, hi[1] + margin]
+    zlim = [lo[2] - margin, hi[2] + margin]
+    
+    # Worker бүр Figure-г нэг удаа үүсгэж frame бүрт зөвхөн өгөгдлийг шинэчилнэ
+    renderer_kwargs = dict(xlim=xlim, ylim=ylim, zlim=zlim, connections=connections,
+                           backend=backend)
+    items = ((points, f'Frame {frame:.0f}/{len(parser.frames)}')
+             for points, frame in zip(all_positions, frames_to_render))
+    images = render_frames(items, SkeletonRenderer, renderer_kwargs, workers=workers)
     
     if use_imageio:
-        # Create video using imageio
-        images = []
+        # Create video using imageio: frame бүрийг санах ойд цуглуулалгүй
+        # шууд encoder руу бичнэ
+        writer, saved_file = open_video_writer(output_file, fps)
+        print(f"Video бичиж байна: {saved_file}")
         
-        for idx, frame in enumerate(frames_to_render):
-            if idx % 50 == 0:
-                print(f"Progress: {idx}/{len(frames_to_render)}")
-            
-            fig = plt.figure(figsize=(10, 8))
-            ax = fig.add_subplot(111, projection='3d')
-            
-            points, connections = parser.get_skeleton_data(frame)
-            
-            # Draw connections (bones)
-            for conn in connections:
-                p1, p2 = points[conn[0]], points[conn[1]]
-                ax.plot([p1[0], p2[0]], [p1[2], p2[2]], [p1[1], p2[1]], 
-                       'b-', linewidth=2, alpha=0.7)
-            
-            # Draw joints
-            ax.scatter(points[:, 0], points[:, 2], points[:, 1], 
-                      c='red', marker='o', s=5, alpha=0.8)
-            
-            ax.set_xlim(xlim)
-            ax.set_ylim(zlim)
-            ax.set_zlim(ylim)
-            ax.view_init(elev=10, azim=90)
-            
-            ax.set_xlabel('X')
-            ax.set_ylabel('Z')
-            ax.set_zlabel('Y')
-            ax.set_title(f'Frame {frame}/{len(parser.frames)}')
-            
-            # Convert to image
-            fig.canvas.draw()
-            image = np.frombuffer(fig.canvas.buffer_rgba(), dtype='uint8')
-            image = image.reshape(fig.canvas.get_width_height()[::-1] + (4,))
-            image = image[:, :, :3]  # Remove alpha channel
-            images.append(image)
-            
-            plt.close(fig)
+        with writer:
+            for idx, image in enumerate(images):
+                if idx % 50 == 0:
+                    print(f"Progress: {idx}/{len(frames_to_render)}")
+                
+                writer.append_data(image)
         
-        print(f"Video хадгалж байна: {output_file}")
-        try:
-            imageio.mimsave(output_file, images, fps=fps)
-            print(f"Амжилттай! Video хадгалагдлаа: {output_file}")
-        except ValueError as e:
-            # Fallback to GIF if MP4 not supported
-            gif_file = output_file.replace('.mp4', '.gif')
-            print(f"MP4 дэмжигдэхгүй байна. GIF үүсгэж байна: {gif_file}")
-            imageio.mimsave(gif_file, images, fps=fps, loop=0)
-            print(f"Амжилттай! GIF хадгалагдлаа: {gif_file}")
+        print(f"Амжилттай! Video хадгалагдлаа: {saved_file}")
         
     else:
         # Save individual frames
@@ -306,37 +255,11 @@ def create_pointcloud_video(bvh_file, output_file='skeleton_animation.mp4', fps=
         
         print(f"Зургуудыг {output_dir}/ хавтасанд хадгалж байна...")
         
-        for idx, frame in enumerate(frames_to_render):
+        for idx, image in enumerate(images):
             if idx % 50 == 0:
                 print(f"Progress: {idx}/{len(frames_to_render)}")
             
-            fig = plt.figure(figsize=(10, 8))
-            ax = fig.add_subplot(111, projection='3d')
-            
-            points, connections = parser.get_skeleton_data(frame)
-            
-            # Draw connections (bones)
-            for conn in connections:
-                p1, p2 = points[conn[0]], points[conn[1]]
-                ax.plot([p1[0], p2[0]], [p1[2], p2[2]], [p1[1], p2[1]], 
-                       'b-', linewidth=2, alpha=0.7)
-            
-            # Draw joints
-            ax.scatter(points[:, 0], points[:, 2], points[:, 1], 
-                      c='red', marker='o', s=5, alpha=0.8)
-            
-            ax.set_xlim(xlim)
-            ax.set_ylim(zlim)
-            ax.set_zlim(ylim)
-            ax.view_init(elev=10, azim=90)
-            
-            ax.set_xlabel('X')
-            ax.set_ylabel('Z')
-            ax.set_zlabel('Y')
-            ax.set_title(f'Frame {frame}/{len(parser.frames)}')
-            
-            plt.savefig(f"{output_dir}/frame_{idx:05d}.png", dpi=100)
-            plt.close(fig)
+            plt.imsave(f"{output_dir}/frame_{idx:05d}.png", image)
         
         print(f"Амжилттай! {len(frames_to_render)} зураг хадгалагдлаа.")
         print(f"Video үүсгэхийн тулд FFmpeg суулгана уу:")
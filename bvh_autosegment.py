@@ -0,0 +1,175 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from bvh_io import BVHReader
+from bvh_segment import save_segments
+
+
+class _BlockMean:
+    """Урсгалаар ирэх frame-ийн утгуудыг hop frame тутмын дундаж болгох"""
+
+    def __init__(self, hop):
+        self.hop = hop
+        self.carry = np.empty(0)
+        self.blocks = []
+
+    def push(self, values):
+        values = np.concatenate([self.carry, values])
+        full = len(values) // self.hop * self.hop
+        if full:
+            self.blocks.append(values[:full].reshape(-1, self.hop).mean(axis=1))
+        self.carry = values[full:]
+
+    def result(self):
+        blocks = self.blocks + ([np.array([self.carry.mean()])] if len(self.carry) else [])
+        return np.concatenate(blocks) if blocks else np.empty(0)
+
+
+def activity_signal(bvh_path, hop_seconds=0.1, chunk_size=4096):
+    """
+    Урт бичлэгийн хөдөлгөөний идэвхийг нэг урсгал дамжилтаар тооцох
+
+    FK хийхгүй: ROOT-ийн position channel-ийн хурд, бүх эргэлтийн
+    channel-ийн өнцгийн хурдны нийлбэрийг (градус/сек) chunk бүрт
+    векторжуулж тооцно. Санах ойд зөвхөн hop_seconds тутмын дундаж үлдэнэ.
+
+    Returns:
+    --------
+    dict :
+        'root_speed', 'angular_speed' : (blocks,) hop тутмын дундаж
+        'hop' : block дахь frame-ийн тоо
+        'fps', 'frames' : эх файлын fps, frame-ийн тоо
+    """
+    with BVHReader(bvh_path) as reader:
+        plan = reader.plan
+        fps = reader.fps
+        hop = max(1, int(round(hop_seconds * fps)))
+        root_cols = plan.position_cols[0][plan.position_cols[0] >= 0]
+        rot_cols = plan.rotation_cols[plan.rotation_cols >= 0]
+
+        root_speed = _BlockMean(hop)
+        angular_speed = _BlockMean(hop)
+        previous = None
+        frames = 0
+        for chunk in reader.iter_chunks(chunk_size):
+            # Chunk-ийн эхний frame-ийн хурдыг өмнөх chunk-ийн сүүлчийнхээс
+            window = chunk if previous is None else np.concatenate([previous, chunk])
+            delta = np.diff(window, axis=0)
+            if previous is None:
+                delta = np.concatenate([np.zeros((1, chunk.shape[1])), delta])
+            previous = chunk[-1:]
+            frames += len(chunk)
+
+            root_speed.push(np.linalg.norm(delta[:, root_cols], axis=1) * fps)
+            # 359° -> -1° шилжилтийг 1° гэж тооцно
+            turn = (delta[:, rot_cols] + 180.0) % 360.0 - 180.0
+            angular_speed.push(np.abs(turn).sum(axis=1) * fps)
+
+    return {
+        'root_speed': root_speed.result(),
+        'angular_speed': angular_speed.result(),
+        'hop': hop,
+        'fps': fps,
+        'frames': frames,
+    }
+
+
+def _runs(mask):
+    """True утгуудын үргэлжилсэн хэсгүүд: (starts, ends) ends нь орохгүй"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_segments(signal, window_seconds=0.5, threshold=0.15, min_rest=1.0,
+                    min_segment=2.0, padding=0.25, prefix='segment'):
+    """
+    Идэвхийн дохиоллоос амралтын хооронд орших давталтуудыг олох
+
+    Хоёр дохиог тус бүрийн 90-р percentile-аар хэвийнжүүлж дундажлаад
+    window_seconds урттай гулсах дунджаар тэгшитгэнэ. threshold-оос доош
+    min_rest-ээс урт хэсгийг амралт гэж үзэж, түүнээс богино зогсолтыг
+    segment дотор үлдээнэ.
+
+    Returns:
+    --------
+    [(start, end, name), ...] : frame 1-ээс эхэлнэ, end орно (load_segments-тэй ижил)
+    """
+    hop, fps, frames = signal['hop'], signal['fps'], signal['frames']
+    block_seconds = hop / fps
+
+    activity = np.zeros(len(signal['root_speed']))
+    if len(activity) == 0:
+        return []
+    for key in ('root_speed', 'angular_speed'):
+        values = signal[key]
+        scale = np.percentile(values, 90)
+        activity += values / scale if scale > 0 else 0.0
+    activity /= 2
+
+    width = max(1, int(round(window_seconds / block_seconds)))
+    activity = np.convolve(activity, np.ones(width) / width, mode='same')
+
+    # Богино амралтыг идэвхтэй гэж тооцож дараалсан давталтыг нэгтгэнэ
+    active = activity >= threshold
+    rest_starts, rest_ends = _runs(~active)
+    for s, e in zip(rest_starts, rest_ends):
+        if (e - s) * block_seconds < min_rest and s > 0 and e < len(active):
+            active[s:e] = True
+
+    pad = int(round(padding / block_seconds))
+    segments = []
+    for s, e in zip(*_runs(active)):
+        if (e - s) * block_seconds < min_segment:
+            continue
+        start = max(0, (s - pad) * hop)
+        end = min(frames, (e + pad) * hop) - 1
+        segments.append((int(start) + 1, int(end) + 1, f"{prefix}_{len(segments) + 1:02d}"))
+    return segments
+
+
+def propose_segments(bvh_path, output_file=None, hop_seconds=0.1, chunk_size=4096,
+                     **detect_kwargs):
+    """
+    BVH бичлэгээс segment хүснэгт санал болгох (сонголтоор .csv/.json-д бичих)
+
+    detect_kwargs нь detect_segments-ийн параметрүүд. prefix өгөөгүй бол
+    файлын нэрийг ашиглана.
+    """
+    detect_kwargs.setdefault('prefix', os.path.splitext(os.path.basename(bvh_path))[0])
+    signal = activity_signal(bvh_path, hop_seconds, chunk_size)
+    segments = detect_segments(signal, **detect_kwargs)
+    if output_file is not None:
+        save_segments(output_file, segments)
+    return segments
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Урт бичлэгийг амралтаар нь автоматаар segment-лэх")
+    arg_parser.add_argument("input", nargs="?", default="shot2.bvh")
+    arg_parser.add_argument("-o", "--output", default=None,
+                            help="Segment хүснэгт (.csv эсвэл .json, default: <input>.segments.csv)")
+    arg_parser.add_argument("--threshold", type=float, default=0.15,
+                            help="Амралтын босго (90-р percentile-ийн хувиар)")
+    arg_parser.add_argument("--min-rest", type=float, default=1.0, help="Секунд")
+    arg_parser.add_argument("--min-segment", type=float, default=2.0, help="Секунд")
+    arg_parser.add_argument("--window", type=float, default=0.5,
+                            help="Тэгшитгэх цонх (секунд)")
+    arg_parser.add_argument("--prefix", default=None, help="Segment-ийн нэрийн угтвар")
+    args = arg_parser.parse_args()
+
+    output_file = args.output or os.path.splitext(args.input)[0] + '.segments.csv'
+    kwargs = dict(window_seconds=args.window, threshold=args.threshold,
+                  min_rest=args.min_rest, min_segment=args.min_segment)
+    if args.prefix:
+        kwargs['prefix'] = args.prefix
+
+    start = time.perf_counter()
+    segments = propose_segments(args.input, output_file, **kwargs)
+    print(f"✅ {len(segments)} segment ({time.perf_counter() - start:.2f} сек) → {output_file}")
+    for s, e, name in segments:
+        print(f"   {name:<20} {s:<8} {e:<8}")
+    print(f"Таслах: python bvh_segment.py {args.input} -s {output_file}")
@@ -0,0 +1,122 @@
+import glob
+import os
+
+import numpy as np
+
+from bvh_fk import SkeletonPlan, forward_kinematics
+from bvh_io import BVHReader, load_cached_bounds, load_cached_motion, save_cached_bounds
+
+
+def compute_bounds(plan, motion, percentiles=(), chunk_size=4096):
+    """
+    Клипийн бүх frame-ийн бүх joint-ийн байрлалын хязгаарыг тооцох
+
+    FK-г chunk_size frame-ээр batch хийж min/max-ийг хуримтлуулна.
+    percentiles өгвөл бүх байрлалыг float32-оор цуглуулж тэнхлэг бүрээр
+    тооцно.
+
+    Parameters:
+    -----------
+    plan : SkeletonPlan
+    motion : (frames, channels)
+    percentiles : iterable of float
+        q (0 < q < 50) бүрт [q, 100 - q] percentile хязгаар
+
+    Returns:
+    --------
+    dict :
+        'min', 'max' : [x, y, z]
+        'percentiles' : {str(q): [[x, y, z] (q), [x, y, z] (100 - q)]}
+    """
+    percentiles = [float(q) for q in percentiles]
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    collected = []
+
+    for start in range(0, len(motion), chunk_size):
+        points = forward_kinematics(plan, np.asarray(motion[start:start + chunk_size], dtype=float))
+        points = points.reshape(-1, 3)
+        lo = np.minimum(lo, points.min(axis=0))
+        hi = np.maximum(hi, points.max(axis=0))
+        if percentiles:
+            collected.append(points.astype(np.float32))
+
+    bounds = {'min': lo.tolist(), 'max': hi.tolist(), 'percentiles': {}}
+    if collected:
+        points = np.concatenate(collected)
+        for q in percentiles:
+            low, high = np.percentile(points, [q, 100 - q], axis=0)
+            bounds['percentiles'][str(q)] = [low.tolist(), high.tolist()]
+    return bounds
+
+
+def _select(bounds, percentile):
+    if percentile is None:
+        return np.array(bounds['min']), np.array(bounds['max'])
+    low, high = bounds['percentiles'][str(float(percentile))]
+    return np.array(low), np.array(high)
+
+
+def clip_bounds(bvh_path, percentile=None, plan=None, motion=None, use_cache=True):
+    """
+    Нэг клипийн хязгаарыг кэштэйгээр авах
+
+    Үр дүнг .bvh_cache/<name>.bounds.json-д эх файлын түлхүүртэй хадгална.
+    Шинэ percentile асуувал кэшид нэмнэ.
+
+    Parameters:
+    -----------
+    percentile : float эсвэл None
+        None бол яг min/max, q бол [q, 100 - q] percentile (гадуурх цэгийг
+        үл тооцох)
+    plan, motion : аль хэдийн parse хийсэн бол дахин уншихгүй
+
+    Returns:
+    --------
+    (lo, hi) : тус бүр (3,) массив
+    """
+    bounds = load_cached_bounds(bvh_path) if use_cache else None
+    if bounds is not None and (percentile is None
+                               or str(float(percentile)) in bounds['percentiles']):
+        return _select(bounds, percentile)
+
+    if plan is None or motion is None:
+        cached = load_cached_motion(bvh_path) if use_cache else None
+        if cached is not None:
+            plan = SkeletonPlan.from_lines(cached[0])
+            motion = cached[2]
+        else:
+            with BVHReader(bvh_path) as reader:
+                plan = reader.plan
+                motion = reader.read_motion()
+
+    wanted = set(bounds['percentiles']) if bounds is not None else set()
+    if percentile is not None:
+        wanted.add(str(float(percentile)))
+    bounds = compute_bounds(plan, motion, sorted(float(q) for q in wanted))
+    if use_cache:
+        save_cached_bounds(bvh_path, bounds)
+    return _select(bounds, percentile)
+
+
+def directory_bounds(folder, percentile=None, use_cache=True):
+    """
+    Хавтсан дахь бүх .bvh клипийн нийлбэр хязгаар (бүх видеод ижил framing)
+
+    percentile өгвөл клип бүрийн percentile хязгаарын нийлбэрийг авна.
+
+    Returns:
+    --------
+    (lo, hi) : тус бүр (3,) массив
+    """
+    files = sorted(glob.glob(os.path.join(folder, '*.bvh')))
+    if not files:
+        raise ValueError(f"{folder}: BVH файл олдсонгүй")
+
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for path in files:
+        clip_lo, clip_hi = clip_bounds(path, percentile, use_cache=use_cache)
+        lo = np.minimum(lo, clip_lo)
+        hi = np.maximum(hi, clip_hi)
+    return lo, hi
@@ -0,0 +1,202 @@
+import glob
+import os
+import re
+
+import numpy as np
+
+from bvh_fk import SkeletonPlan, forward_kinematics
+from bvh_io import BVHReader, load_cached_motion, save_cached_motion
+
+# vdolgion_1c1.bvh -> бүжиг 'vdolgion', хувилбар '1c', дубль 1
+CLIP_NAME = re.compile(r'^(?P<dance>[^_]+)_(?P<variant>\d+[a-z]+)(?P<take>\d+)$')
+
+
+def parse_clip_name(path):
+    """
+    Файлын нэрээс клипийн мэдээлэл задлах
+
+    Returns:
+    --------
+    dict : 'name', 'dance', 'variant', 'take'
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = CLIP_NAME.match(name)
+    if match is None:
+        raise ValueError(f"{path}: '<бүжиг>_<хувилбар><дубль>.bvh' хэлбэрийн нэр биш")
+    return {
+        'name': name,
+        'dance': match.group('dance'),
+        'variant': match.group('variant'),
+        'take': int(match.group('take')),
+    }
+
+
+def read_clip(path, dtype=np.float64, use_cache=True):
+    """(hierarchy_lines, frame_time, motion), кэшгүй бол parse хийж кэшлэнэ"""
+    cached = load_cached_motion(path, dtype) if use_cache else None
+    if cached is not None:
+        return cached
+    with BVHReader(path) as reader:
+        motion = reader.read_motion(dtype)
+        lines, frame_time = reader.hierarchy_lines, reader.frame_time
+    if use_cache:
+        save_cached_motion(path, lines, frame_time, motion)
+    return lines, frame_time, motion
+
+
+def _check_topology(plan, other, path):
+    """Joint-ууд, эцэг, channel-ийн байршил ижил эсэх (ясны урт ялгаатай байж болно)"""
+    same = (plan.names == other.names
+            and np.array_equal(plan.parents, other.parents)
+            and np.array_equal(plan.position_cols, other.position_cols)
+            and np.array_equal(plan.rotation_cols, other.rotation_cols)
+            and np.array_equal(plan.rotation_axes, other.rotation_axes))
+    if not same:
+        raise ValueError(f"{path}: skeleton-ий бүтэц корпусын бусад клиптэй таарахгүй байна")
+
+
+class MotionCorpus:
+    """
+    Хавтас дахь бүх клипийг нэг skeleton-оор нэгтгэсэн корпус
+
+    Бүх motion нэг (frames, channels) массивт дараалан байрлана. k-р
+    клип нь motion[starts[k]:starts[k + 1]]. Клипүүд joint/channel-ийн
+    бүтцээр ижил байх ёстой; жүжигчин бүрийн ясны урт (OFFSET) өөр байж
+    болох тул клип бүрийн offset-ийг bone_offsets-д хадгална.
+
+    Usage:
+    ------
+    corpus = MotionCorpus.from_folder('DATA')
+    hands = corpus.forward_kinematics(joints=['LeftHand', 'RightHand'])
+    for k in corpus.select(dance='vnuman'):
+        clip_hands = hands[corpus.clip_slice(k)]
+
+    Attributes:
+    -----------
+    plan : SkeletonPlan, эхний клипийн төлөвлөгөө
+    motion : (frames, channels)
+    starts : (clips + 1,) int64
+    clips : list of dict ('name', 'path', 'dance', 'variant', 'take', 'frames')
+    bone_offsets : (clips, joints, 3)
+    frame_time : float
+    """
+
+    def __init__(self, plan, motion, starts, clips, bone_offsets, frame_time):
+        self.plan = plan
+        self.motion = motion
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.clips = clips
+        self.bone_offsets = np.asarray(bone_offsets, dtype=float)
+        self.frame_time = frame_time
+        self.index = {clip['name']: k for k, clip in enumerate(clips)}
+
+    def __len__(self):
+        return len(self.clips)
+
+    @property
+    def fps(self):
+        return 1.0 / self.frame_time
+
+    @classmethod
+    def from_folder(cls, folder='DATA', pattern='*.bvh', dtype=np.float64, use_cache=True):
+        """
+        Хавтсыг уншиж корпус бүтээх
+
+        HIERARCHY текст бүрийг нэг л удаа parse хийнэ (ижил тексттэй
+        клипүүд төлөвлөгөөгөө хуваалцана). Бүтэц эсвэл frame time
+        зөрвөл ValueError.
+        """
+        files = sorted(glob.glob(os.path.join(folder, pattern)))
+        if not files:
+            raise ValueError(f"{folder}: BVH файл олдсонгүй")
+
+        plans = {}  # HIERARCHY текст -> SkeletonPlan
+        plan = frame_time = None
+        clips, motions, bone_offsets = [], [], []
+        for path in files:
+            clip = parse_clip_name(path)
+            lines, clip_frame_time, motion = read_clip(path, dtype, use_cache)
+
+            text = ''.join(lines)
+            clip_plan = plans.get(text)
+            if clip_plan is None:
+                clip_plan = plans[text] = SkeletonPlan.from_lines(lines)
+            if plan is None:
+                plan, frame_time = clip_plan, clip_frame_time
+            else:
+                _check_topology(plan, clip_plan, path)
+                if not np.isclose(clip_frame_time, frame_time):
+                    raise ValueError(f"{path}: frame time {clip_frame_time} "
+                                     f"(корпусын {frame_time}-с ялгаатай)")
+
+            clip.update(path=path, frames=len(motion))
+            clips.append(clip)
+            motions.append(motion)
+            bone_offsets.append(clip_plan.offsets)
+
+        starts = np.concatenate([[0], np.cumsum([len(m) for m in motions])])
+        return cls(plan, np.concatenate(motions), starts, clips, bone_offsets, frame_time)
+
+    # ===== Клип сонгох =====
+
+    def _clip_idx(self, clip):
+        return self.index[clip] if isinstance(clip, str) else int(clip)
+
+    def clip_slice(self, clip):
+        """Клипийн (нэр эсвэл индекс) корпус дахь frame-ийн slice"""
+        k = self._clip_idx(clip)
+        return slice(int(self.starts[k]), int(self.starts[k + 1]))
+
+    def clip_motion(self, clip):
+        return self.motion[self.clip_slice(clip)]
+
+    def clip_of_frame(self, frames):
+        """Корпусын frame индекс(үүд) эсвэл slice-ийн харьяалагдах клипийн индекс"""
+        if isinstance(frames, slice):
+            frames = np.arange(*frames.indices(len(self.motion)))
+        return np.searchsorted(self.starts, frames, side='right') - 1
+
+    def select(self, dance=None, variant=None, take=None):
+        """Шүүлтэд тохирох клипүүдийн индексийн жагсаалт"""
+        return [k for k, clip in enumerate(self.clips)
+                if (dance is None or clip['dance'] == dance)
+                and (variant is None or clip['variant'] == variant)
+                and (take is None or clip['take'] == take)]
+
+    def iter_clips(self):
+        """(clip dict, motion) хосуудыг дарааллаар yield хийх"""
+        for k, clip in enumerate(self.clips):
+            yield clip, self.motion[self.clip_slice(k)]
+
+    # ===== FK =====
+
+    def frame_offsets(self, frames=None):
+        """(frames, joints, 3) frame бүрт харгалзах клипийн ясны offset"""
+        if frames is None:
+            counts = np.diff(self.starts)
+            return np.repeat(self.bone_offsets, counts, axis=0)
+        return self.bone_offsets[self.clip_of_frame(frames)]
+
+    def forward_kinematics(self, frames=None, joints=None, return_transforms=False):
+        """
+        Корпусын (эсвэл frames-ийн) бүх frame-ийн FK-г нэг дуудлагаар тооцох
+
+        Клип бүр өөрийн ясны уртаар тооцогдоно.
+        """
+        motion = self.motion if frames is None else self.motion[frames]
+        return forward_kinematics(self.plan, motion, return_transforms, joints,
+                                  offsets=self.frame_offsets(frames))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else 'DATA'
+    start = time.perf_counter()
+    corpus = MotionCorpus.from_folder(folder)
+    print(f"📂 {folder}: {len(corpus)} клип, {len(corpus.motion)} frame, "
+          f"{len(corpus.plan)} joint ({time.perf_counter() - start:.2f} сек)")
+    for clip in corpus.clips:
+        print(f"  {clip['name']:<16} {clip['dance']:<10} {clip['variant']:<3} "
+              f"#{clip['take']:<2} {clip['frames']:>6} frame")
@@ -0,0 +1,287 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bvh_corpus import MotionCorpus
+from bvh_search import DEFAULT_JOINTS, embed_windows, heading
+
+
+def pose_sequences(corpus, joints=DEFAULT_JOINTS, step=1):
+    """
+    Клип бүрийн frame бүрийн pose векторууд (DTW-ийн оролт)
+
+    Frame бүрийг өөрийн ROOT-ийн XZ байрлал, чиглэлээр хэвийнжүүлнэ
+    (embed_windows-ийн нэг frame-тэй цонх). step > 1 бол frame-ийг сийрэгжүүлнэ.
+
+    Returns:
+    --------
+    list of (frames, joints * 3) float32
+    """
+    positions, transforms = corpus.forward_kinematics(joints=joints, return_transforms=True)
+    vectors = embed_windows(positions, heading(transforms[:, 0]),
+                            np.arange(len(positions)), 1, 1)
+    return [vectors[corpus.clip_slice(k)][::step] for k in range(len(corpus))]
+
+
+# ===== Sakoe-Chiba band =====
+
+def band_limits(n, m, band=None):
+    """
+    x-ийн мөр i бүрт y-ийн зөвшөөрөгдөх [lo, hi] баганууд
+
+    Band нь (0, 0)-оос (n - 1, m - 1) хүртэлх налуу диагоналын хоёр талд
+    radius = band * max(n, m) frame. Зам тасрахгүйн тулд radius-ыг налуугаас
+    багагүй байлгана. band=None бол хязгааргүй.
+
+    Returns:
+    --------
+    (lo, hi) : (n,) int
+    """
+    if band is None:
+        return np.zeros(n, dtype=np.intp), np.full(n, m - 1, dtype=np.intp)
+    radius = max(band * max(n, m), (m - 1) / max(n - 1, 1), 1.0)
+    center = np.arange(n) * ((m - 1) / max(n - 1, 1))
+    lo = np.clip(np.ceil(center - radius), 0, m - 1).astype(np.intp)
+    hi = np.clip(np.floor(center + radius), 0, m - 1).astype(np.intp)
+    return lo, hi
+
+
+def lb_keogh(x, y, band=None):
+    """
+    LB_Keogh: dtw(x, y, band)-ээс хэтрэхгүй доод хязгаар
+
+    x-ийн frame i нь y-ийн band доторх ядаж нэг frame-тэй заавал
+    холбогдох тул тэдгээрийн тэнхлэг бүрийн min/max хайрцаг (envelope)
+    хүртэлх зай нь тухайн алхмын өртгөөс их байж чадахгүй.
+    """
+    lo, hi = band_limits(len(x), len(y), band)
+    width = int((hi - lo).max()) + 1
+    # Цонх бүр lo-оос эхэлж width урттай; hi-аас хальсан хэсгийг масклана
+    padded = np.concatenate([y, np.repeat(y[-1:], width - 1, axis=0)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width, axis=0)[lo]
+    inside = (np.arange(width) <= (hi - lo)[:, np.newaxis])[:, np.newaxis, :]
+    upper = np.where(inside, windows, -np.inf).max(axis=2)
+    lower = np.where(inside, windows, np.inf).min(axis=2)
+    outside = x - np.clip(x, lower, upper)
+    return float(np.sqrt(np.einsum('ij,ij->i', outside, outside)).sum())
+
+
+# ===== Batched DTW =====
+
+def dtw_batch(xs, ys, band=None, return_rows=False):
+    """
+    Олон (x, y) хосын DTW зайг нэг дор тооцох
+
+    Өртөг нь frame-үүдийн Евклидийн зай. Мөр i-ийн утгуудыг өмнөх мөрөөс
+
+        D[i, j] = S[j] + min_{k <= j} (min(D[i-1, k], D[i-1, k-1]) - S[k-1])
+
+    (S нь мөрийн өртгийн cumsum) томьёогоор np.minimum.accumulate-аар нэг
+    дор гаргана. Иймд Python давталт зөвхөн мөрөөр, бүх хос, бүх баганад
+    векторжсон.
+
+    Parameters:
+    -----------
+    xs, ys : list of (n_b, d), (m_b, d) массив
+    band : float эсвэл None (band_limits)
+    return_rows : bool
+        True бол (хос нэгтэй үед) бүтэн D матрицыг мөн буцаана
+
+    Returns:
+    --------
+    (pairs,) float64 зайнууд [, (n, m) D]
+    """
+    num_pairs = len(xs)
+    n_lens = np.array([len(x) for x in xs])
+    m_lens = np.array([len(y) for y in ys])
+    N, M = n_lens.max(), m_lens.max()
+    dim = xs[0].shape[1]
+
+    X = np.zeros((num_pairs, N, dim))
+    Y = np.zeros((num_pairs, M, dim))
+    lo = np.zeros((num_pairs, N), dtype=np.intp)
+    hi = np.full((num_pairs, N), -1, dtype=np.intp)
+    for b, (x, y) in enumerate(zip(xs, ys)):
+        X[b, :len(x)] = x
+        Y[b, :len(y)] = y
+        lo[b, :len(x)], hi[b, :len(x)] = band_limits(len(x), len(y), band)
+
+    xx = np.einsum('bnd,bnd->bn', X, X)
+    yy = np.einsum('bmd,bmd->bm', Y, Y)
+    cols = np.arange(M)
+    result = np.full(num_pairs, np.inf)
+    rows = np.empty((N, M)) if return_rows else None
+
+    prev = np.full((num_pairs, M), np.inf)
+    start = np.full((num_pairs, M), np.inf)
+    start[:, 0] = 0.0  # D[-1, -1] = 0
+    for i in range(N):
+        inside = (cols >= lo[:, i, np.newaxis]) & (cols <= hi[:, i, np.newaxis])
+        cost = xx[:, i, np.newaxis] - 2 * np.einsum('bd,bmd->bm', X[:, i], Y) + yy
+        cost = np.where(inside, np.sqrt(np.maximum(cost, 0)), 0.0)
+
+        if i == 0:
+            enter = start
+        else:
+            enter = prev.copy()
+            np.minimum(enter[:, 1:], prev[:, :-1], out=enter[:, 1:])
+        enter = np.where(inside, enter, np.inf)
+
+        cumulative = np.cumsum(cost, axis=1)
+        current = cumulative + np.minimum.accumulate(enter - (cumulative - cost), axis=1)
+        current = np.where(inside, current, np.inf)
+
+        done = np.flatnonzero(n_lens == i + 1)
+        result[done] = current[done, m_lens[done] - 1]
+        if return_rows:
+            rows[i] = current[0]
+        prev = current
+
+    if return_rows:
+        return result, rows[:n_lens[0], :m_lens[0]]
+    return result
+
+
+def dtw(x, y, band=None):
+    """Хоёр дарааллын DTW зай"""
+    return float(dtw_batch([x], [y], band)[0])
+
+
+def dtw_path(x, y, band=None):
+    """
+    DTW зай ба alignment зам
+
+    Returns:
+    --------
+    (distance, path) : path нь (steps, 2) [i, j] хосууд (0, 0)-оос эхэлнэ
+    """
+    distances, D = dtw_batch([x], [y], band, return_rows=True)
+    i, j = len(x) - 1, len(y) - 1
+    path = [(i, j)]
+    while i > 0 or j > 0:
+        candidates = [(i - 1, j - 1), (i - 1, j), (i, j - 1)]
+        i, j = min((c for c in candidates if c[0] >= 0 and c[1] >= 0),
+                   key=lambda c: D[c])
+        path.append((i, j))
+    return float(distances[0]), np.array(path[::-1])
+
+
+def nearest(query, candidates, band=None, k=1):
+    """
+    LB_Keogh-оор тайрч query-д хамгийн ойр k дарааллыг олох
+
+    Доод хязгаараар эрэмбэлж DTW-г дарааллаар тооцно. Дараагийн доод
+    хязгаар одоогийн k-р шилдэг зайнаас их бол үлдсэнийг алгасна.
+
+    Returns:
+    --------
+    (list of (distance, candidate index), DTW тооцсон тоо)
+    """
+    bounds = np.array([max(lb_keogh(query, c, band), lb_keogh(c, query, band))
+                       for c in candidates])
+    best = []
+    computed = 0
+    for idx in np.argsort(bounds):
+        if len(best) == k and bounds[idx] >= best[-1][0]:
+            break
+        best.append((dtw(query, candidates[idx], band), int(idx)))
+        best.sort()
+        best = best[:k]
+        computed += 1
+    return best, computed
+
+
+# ===== All-pairs =====
+
+_sequences = None
+
+
+def _init_dtw_worker(sequences):
+    global _sequences
+    _sequences = sequences
+
+
+def _dtw_pairs(pairs, band):
+    return dtw_batch([_sequences[i] for i, _ in pairs],
+                     [_sequences[j] for _, j in pairs], band)
+
+
+def dtw_matrix(sequences, band=0.1, workers=None, batch_size=16, max_distance=None,
+               normalize=True):
+    """
+    Бүх хосын DTW зайны тэгш хэмт матриц
+
+    Хосуудыг уртаар нь эрэмбэлж (padding багасгах) batch_size-аар
+    dtw_batch-д өгч, batch-уудыг process pool-д тараана.
+
+    Parameters:
+    -----------
+    workers : int эсвэл None
+        None бол CPU-ийн тоо, 1 бол нэг процесст
+    max_distance : float, optional
+        LB_Keogh нь үүнээс их хосуудын DTW-г тооцохгүй (inf болно)
+    normalize : bool
+        True бол зайг (n + m)-д хуваана (өөр урттай хосуудыг харьцуулах)
+
+    Returns:
+    --------
+    (clips, clips) float64, тооцоогүй хос inf
+    """
+    count = len(sequences)
+    lengths = np.array([len(s) for s in sequences])
+    pairs = [(i, j) for i in range(count) for j in range(i + 1, count)]
+    scale = {(i, j): (lengths[i] + lengths[j]) if normalize else 1.0 for i, j in pairs}
+
+    if max_distance is not None:
+        pairs = [(i, j) for i, j in pairs
+                 if max(lb_keogh(sequences[i], sequences[j], band),
+                        lb_keogh(sequences[j], sequences[i], band)) / scale[i, j]
+                 <= max_distance]
+
+    pairs.sort(key=lambda p: (lengths[p[0]], lengths[p[1]]))
+    batches = [pairs[s:s + batch_size] for s in range(0, len(pairs), batch_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        _init_dtw_worker(sequences)
+        results = [_dtw_pairs(batch, band) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_dtw_worker,
+                                 initargs=(sequences,)) as executor:
+            results = list(executor.map(_dtw_pairs, batches, [band] * len(batches)))
+
+    matrix = np.full((count, count), np.inf)
+    np.fill_diagonal(matrix, 0.0)
+    for batch, distances in zip(batches, results):
+        for (i, j), d in zip(batch, distances):
+            matrix[i, j] = matrix[j, i] = d / scale[i, j]
+    return matrix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Корпусын клипүүдийн DTW зайны матриц")
+    parser.add_argument("folder", nargs="?", default="DATA")
+    parser.add_argument("-o", "--output", default="dtw_matrix.npz")
+    parser.add_argument("--band", type=float, default=0.1,
+                        help="Sakoe-Chiba band, клипийн уртын хувиар")
+    parser.add_argument("--step", type=int, default=2, help="Frame сийрэгжүүлэх алхам")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    corpus = MotionCorpus.from_folder(args.folder)
+    sequences = pose_sequences(corpus, step=args.step)
+
+    start = time.perf_counter()
+    matrix = dtw_matrix(sequences, args.band, args.workers)
+    print(f"✅ {len(sequences)}×{len(sequences)} DTW ({time.perf_counter() - start:.2f} сек)")
+
+    names = np.array([clip['name'] for clip in corpus.clips])
+    np.savez(args.output, matrix=matrix, names=names)
+    for k, name in enumerate(names):
+        row = matrix[k].copy()
+        row[k] = np.inf
+        print(f"  {name:<16} → {names[row.argmin()]:<16} {row.min():.3f}")
@@ -0,0 +1,236 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bvh_corpus import parse_clip_name, read_clip
+from bvh_fk import SkeletonPlan, forward_kinematics
+from bvh_io import load_cached_features, save_cached_features
+
+ROOT = 0  # DFS дараалалд ROOT үргэлж эхэнд
+
+
+# ===== Frame бүрийн feature-ууд =====
+# Функц бүр (frames, len(joints), 3) байрлал, fps авч (frames,) эсвэл
+# (frames, k) массив буцаана. joints=None бол бүх joint.
+
+def _speed(points, fps):
+    """Joint бүрийн хурд (нэгж/сек), (frames, joints)"""
+    if len(points) < 2:
+        return np.zeros(points.shape[:2])
+    return np.linalg.norm(np.gradient(points, axis=0), axis=-1) * fps
+
+
+def root_speed(points, fps):
+    return _speed(points, fps)[:, 0]
+
+
+def root_travel(points, fps):
+    """ROOT-ийн хэвтээ (XZ) хавтгайд туулсан хуримтлагдсан зам"""
+    step = np.linalg.norm(np.diff(points[:, 0, [0, 2]], axis=0), axis=-1)
+    return np.concatenate([[0.0], np.cumsum(step)])
+
+
+def hand_height(points, fps):
+    """Зүүн, баруун гарын өндөр (Y), (frames, 2)"""
+    return points[:, :, 1]
+
+
+def joint_speed(points, fps):
+    return _speed(points, fps)
+
+
+def mean_joint_speed(points, fps):
+    return _speed(points, fps).mean(axis=1)
+
+
+# нэр -> (хэрэгтэй joint-ууд эсвэл None = бүгд, функц)
+FEATURES = {
+    'root_speed': ((ROOT,), root_speed),
+    'root_travel': ((ROOT,), root_travel),
+    'hand_height': (('LeftHand', 'RightHand'), hand_height),
+    'joint_speed': (None, joint_speed),
+    'mean_joint_speed': (None, mean_joint_speed),
+}
+
+DEFAULT_FEATURES = ('root_speed', 'root_travel', 'hand_height', 'mean_joint_speed')
+
+
+def compute_features(plan, motion, frame_time, names=DEFAULT_FEATURES):
+    """
+    Нэг клипийн frame бүрийн feature-уудыг тооцох
+
+    Сонгосон feature-уудад хэрэгтэй joint-уудын нийлбэрээр FK-г нэг удаа
+    (боломжтой бол хэсэгчилсэн гинжээр) тооцоод бүгдэд хуваалцана.
+
+    Returns:
+    --------
+    dict : feature нэр -> (frames,) эсвэл (frames, k) float32 массив
+    """
+    unknown = [name for name in names if name not in FEATURES]
+    if unknown:
+        raise ValueError(f"Тодорхойгүй feature: {', '.join(unknown)}")
+
+    specs = {name: FEATURES[name] for name in names}
+    if any(joints is None for joints, _ in specs.values()):
+        needed = None
+        column = np.arange(len(plan))
+    else:
+        needed = sorted({plan.index[j] if isinstance(j, str) else j
+                         for joints, _ in specs.values() for j in joints})
+        column = np.full(len(plan), -1)
+        column[needed] = np.arange(len(needed))
+
+    positions = forward_kinematics(plan, motion, joints=needed)
+    fps = 1.0 / frame_time
+    features = {}
+    for name, (joints, func) in specs.items():
+        if joints is None:
+            points = positions
+        else:
+            points = positions[:, column[[plan.index[j] if isinstance(j, str) else j
+                                          for j in joints]]]
+        features[name] = np.asarray(func(points, fps), dtype=np.float32)
+    return features
+
+
+def summarize(features):
+    """Frame бүрийн feature-уудаас клипийн дундаж, хамгийн их утгууд"""
+    summary = {}
+    for name, values in features.items():
+        summary[name + '_mean'] = values.mean(axis=0)
+        summary[name + '_max'] = values.max(axis=0)
+    return summary
+
+
+def _clip_features(path, names, use_cache):
+    """Process pool-ийн ажил: нэг клипийн feature-уудыг тооцож кэшлэх"""
+    lines, frame_time, motion = read_clip(path, use_cache=use_cache)
+    plan = SkeletonPlan.from_lines(lines)
+    features = compute_features(plan, np.asarray(motion, dtype=float), frame_time, names)
+    if use_cache:
+        save_cached_features(path, features)
+    return features, frame_time
+
+
+# ===== Корпусын pipeline =====
+
+def extract_features(folder='DATA', output_file='features.npz', names=DEFAULT_FEATURES,
+                     workers=None, use_cache=True):
+    """
+    Хавтас дахь бүх клипийн feature-уудыг тооцож нэг .npz файлд бичих
+
+    Эх файл нь өөрчлөгдөөгүй клипийн feature-ийг .bvh_cache-аас авна,
+    бусдыг process pool-оор зэрэг тооцно.
+
+    Гаралтын багана (frame бүрт нэг мөр):
+        frame_clip, frame_index, frame_<feature>
+    Клип бүрт нэг мөр:
+        clip_name, clip_dance, clip_variant, clip_take, clip_frames,
+        clip_duration, clip_<feature>_mean, clip_<feature>_max
+
+    Parameters:
+    -----------
+    workers : int эсвэл None
+        None бол CPU-ийн тоо, 1 бол нэг процесст
+
+    Returns:
+    --------
+    (тооцсон клипийн тоо, нийт клипийн тоо)
+    """
+    names = tuple(names)
+    files = sorted(glob.glob(os.path.join(folder, '*.bvh')))
+    if not files:
+        raise ValueError(f"{folder}: BVH файл олдсонгүй")
+
+    # Нэрийг тооцоолохоос өмнө шалгана: буруу нэртэй файлыг алгасна
+    clips = {}
+    for path in files:
+        try:
+            clips[path] = parse_clip_name(path)
+        except ValueError as e:
+            print(f"⚠️  {e} (алгасав)")
+    files = list(clips)
+    if not files:
+        raise ValueError(f"{folder}: '<бүжиг>_<хувилбар><дубль>.bvh' нэртэй файл олдсонгүй")
+
+    results = {}
+    stale = []
+    for path in files:
+        cached = load_cached_features(path, names) if use_cache else None
+        if cached is None:
+            stale.append(path)
+        else:
+            results[path] = cached, read_clip(path, use_cache=use_cache)[1]
+
+    if stale:
+        if workers == 1 or len(stale) == 1:
+            computed = [_clip_features(path, names, use_cache) for path in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                computed = list(executor.map(_clip_features, stale,
+                                             [names] * len(stale), [use_cache] * len(stale)))
+        results.update(zip(stale, computed))
+
+    columns = {
+        'frame_clip': [], 'frame_index': [],
+        'clip_name': [], 'clip_dance': [], 'clip_variant': [], 'clip_take': [],
+        'clip_frames': [], 'clip_duration': [],
+    }
+    per_frame = {name: [] for name in names}
+    per_clip = {}
+    for k, path in enumerate(files):
+        features, frame_time = results[path]
+        clip = clips[path]
+        num_frames = len(features[names[0]]) if names else 0
+
+        columns['frame_clip'].append(np.full(num_frames, k, dtype=np.int32))
+        columns['frame_index'].append(np.arange(num_frames, dtype=np.int32))
+        columns['clip_name'].append(clip['name'])
+        columns['clip_dance'].append(clip['dance'])
+        columns['clip_variant'].append(clip['variant'])
+        columns['clip_take'].append(clip['take'])
+        columns['clip_frames'].append(num_frames)
+        columns['clip_duration'].append(num_frames * frame_time)
+        for name in names:
+            per_frame[name].append(features[name])
+        for name, value in summarize(features).items():
+            per_clip.setdefault(name, []).append(value)
+
+    arrays = {
+        'frame_clip': np.concatenate(columns['frame_clip']),
+        'frame_index': np.concatenate(columns['frame_index']),
+    }
+    for key in ('clip_name', 'clip_dance', 'clip_variant', 'clip_take',
+                'clip_frames', 'clip_duration'):
+        arrays[key] = np.array(columns[key])
+    for name, values in per_frame.items():
+        arrays['frame_' + name] = np.concatenate(values)
+    for name, values in per_clip.items():
+        arrays['clip_' + name] = np.array(values)
+
+    tmp_path = output_file + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, output_file)
+    return len(stale), len(files)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BVH корпусын kinematic feature-уудыг тооцох")
+    parser.add_argument("folder", nargs="?", default="DATA")
+    parser.add_argument("-o", "--output", default="features.npz")
+    parser.add_argument("-f", "--features", nargs="+", default=list(DEFAULT_FEATURES),
+                        choices=sorted(FEATURES))
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Процессын тоо (default: CPU-ийн тоо)")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    computed, total = extract_features(args.folder, args.output, args.features,
+                                       args.workers, use_cache=not args.no_cache)
+    print(f"✅ {args.output}: {total} клип ({computed} шинээр тооцсон, "
+          f"{total - computed} кэшээс) {time.perf_counter() - start:.2f} сек")
@@ -0,0 +1,443 @@
+import numpy as np
+
+# Channel нэрийн эхний үсгээс тэнхлэгийн индекс
+AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+def axis_rotation(axis, angles):
+    """
+    Тэнхлэгийн эргэлтийн матрицуудыг бүх frame-д нэг дор тооцох
+
+    Parameters:
+    -----------
+    axis : int or np.ndarray
+        0 = X, 1 = Y, 2 = Z. Массив бол angles-ийн сүүлийн тэнхлэгтэй
+        ижил урттай байна (joint бүр өөр тэнхлэгтэй байж болно)
+    angles : np.ndarray
+        (frames,) эсвэл (frames, n) хэмжээтэй өнцгүүд (градусаар)
+
+    Returns:
+    --------
+    np.ndarray : angles.shape + (3, 3) эргэлтийн матрицууд
+    """
+    angles = np.radians(np.asarray(angles, dtype=float))
+    scalar_axis = np.ndim(axis) == 0
+    if scalar_axis:
+        angles = angles[..., np.newaxis]
+    axis = np.broadcast_to(np.asarray(axis), angles.shape[-1:])
+
+    c = np.cos(angles)
+    s = np.sin(angles)
+    rot = np.zeros(angles.shape + (3, 3))
+    for a in range(3):
+        mask = axis == a
+        if not mask.any():
+            continue
+        i, j = [k for k in range(3) if k != a]
+        # Y тэнхлэгийн эргэлтийн sin тэмдэг эсрэг байдаг
+        sign = -1.0 if a == 1 else 1.0
+        rot[..., mask, a, a] = 1.0
+        rot[..., mask, i, i] = c[..., mask]
+        rot[..., mask, j, j] = c[..., mask]
+        rot[..., mask, i, j] = -sign * s[..., mask]
+        rot[..., mask, j, i] = sign * s[..., mask]
+
+    if scalar_axis:
+        rot = rot[..., 0, :, :]
+    return rot
+
+
+class SkeletonPlan:
+    """
+    Parse хийх үед нэг удаа бүтээгдэх skeleton-ий хавтгай төлөвлөгөө
+
+    Joint-ууд DFS (pre-order) дарааллаар байрлана (get_skeleton_data-ийн
+    цэгийн дараалалтай ижил). Channel-ийн нэр, dict хайлт зэргийг энд нэг
+    удаа шийдэж, FK зөвхөн индекс массив ашиглана.
+
+    Attributes:
+    -----------
+    names : list of str
+    parents : (joints,) int, ROOT-д -1
+    offsets : (joints, 3) float
+    position_cols : (joints, 3) int, X/Y/Z position channel-ийн багана (-1 = байхгүй)
+    rotation_cols : (joints, 3) int, эргэлтийн channel-ийн баганууд хэрэглэх дарааллаар
+    rotation_axes : (joints, 3) int, тэдгээрийн тэнхлэг (0/1/2, -1 = байхгүй)
+    end_sites : list of int, End Site-ийн индексүүд
+    num_channels : int
+    rotate_offsets : bool
+        True бол local эргэлтийг channel-ийн урвуу дарааллаар үржүүлж
+        translation-ийг (offset) мөн эргүүлнэ (animation3-ийн хэвшил)
+    """
+
+    def __init__(self, names, parents, offsets, position_cols, rotation_cols,
+                 rotation_axes, end_sites=(), num_channels=None, rotate_offsets=False):
+        self.names = list(names)
+        self.parents = np.asarray(parents, dtype=np.intp)
+        self.offsets = np.asarray(offsets, dtype=float).reshape(-1, 3)
+        self.position_cols = np.asarray(position_cols, dtype=np.intp).reshape(-1, 3)
+        self.rotation_cols = np.asarray(rotation_cols, dtype=np.intp).reshape(-1, 3)
+        self.rotation_axes = np.asarray(rotation_axes, dtype=np.intp).reshape(-1, 3)
+        self.end_sites = list(end_sites)
+        if num_channels is None:
+            num_channels = int(max(self.position_cols.max(initial=-1),
+                                   self.rotation_cols.max(initial=-1)) + 1)
+        self.num_channels = num_channels
+        self.rotate_offsets = rotate_offsets
+
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.connections = [(int(p), j) for j, p in enumerate(self.parents) if p >= 0]
+
+        # Гүнээр бүлэглэсэн индексүүд: нэг түвшний joint-уудыг нэг дор тооцно
+        depth = np.zeros(len(self.names), dtype=np.intp)
+        for j, p in enumerate(self.parents):
+            if p >= 0:
+                depth[j] = depth[p] + 1
+        self.levels = [np.flatnonzero(depth == d) for d in range(depth.max(initial=-1) + 1)]
+
+        # subset() -ийн үр дүн: хүссэн joint-уудын tuple -> (plan, indices)
+        self._subsets = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_joint_list(cls, joints, rotate_offsets=False):
+        """
+        DFS дараалсан (name, parent_idx, offset, channels, is_end) жагсаалтаас бүтээх
+        """
+        names, parents, offsets = [], [], []
+        position_cols, rotation_cols, rotation_axes = [], [], []
+        end_sites = []
+        channel_idx = 0
+
+        for current_idx, (name, parent_idx, offset, channels, is_end) in enumerate(joints):
+            names.append(name)
+            parents.append(parent_idx)
+            offsets.append(offset)
+            if is_end:
+                end_sites.append(current_idx)
+
+            pos_cols = [-1, -1, -1]
+            rot_cols, rot_axes = [], []
+            for channel in channels:
+                axis = AXES[channel[0].lower()]
+                if 'position' in channel:
+                    pos_cols[axis] = channel_idx
+                elif 'rotation' in channel:
+                    rot_cols.append(channel_idx)
+                    rot_axes.append(axis)
+                channel_idx += 1
+            position_cols.append(pos_cols)
+            rotation_cols.append(rot_cols + [-1] * (3 - len(rot_cols)))
+            rotation_axes.append(rot_axes + [-1] * (3 - len(rot_axes)))
+
+        return cls(names, parents, offsets, position_cols, rotation_cols,
+                   rotation_axes, end_sites, channel_idx, rotate_offsets)
+
+    @classmethod
+    def from_root(cls, root, rotate_offsets=False):
+        """BVHParser-ийн joint dict модноос төлөвлөгөө бүтээх"""
+        joints = []
+        stack = [(root, -1)]
+        while stack:
+            joint, parent_idx = stack.pop()
+            current_idx = len(joints)
+            is_end = joint.get('is_end') or (not joint['channels'] and not joint['children']
+                                             and parent_idx >= 0)
+            joints.append((joint['name'], parent_idx, joint['offset'],
+                           joint['channels'], bool(is_end)))
+
+            # Stack учир хүүхдүүдийг урвуу дарааллаар нэмнэ
+            for child in reversed(joint['children']):
+                stack.append((child, current_idx))
+
+        return cls.from_joint_list(joints, rotate_offsets)
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        HIERARCHY текстийн мөрүүдээс шууд төлөвлөгөө бүтээх
+
+        Файл дахь ROOT/JOINT/End Site-ийн дараалал нь DFS дараалалтай ижил
+        тул нэг дамжилтаар уншина. End Site-ийг BVHParser шиг '<эцэг>_end'
+        гэж нэрлэнэ.
+        """
+        joints = []
+        stack = []      # Нээлттэй '{' бүрийн joint индекс
+        pending = None  # '{' хүлээж буй joint
+        for line in lines:
+            parts = line.split()
+            if not parts:
+                continue
+            key = parts[0]
+            if key in ('ROOT', 'JOINT'):
+                parent_idx = stack[-1] if stack else -1
+                joints.append([parts[1], parent_idx, [0.0, 0.0, 0.0], [], False])
+                pending = len(joints) - 1
+            elif key == 'End':
+                parent_idx = stack[-1]
+                joints.append([joints[parent_idx][0] + '_end', parent_idx,
+                               [0.0, 0.0, 0.0], [], True])
+                pending = len(joints) - 1
+            elif key == '{':
+                stack.append(pending)
+            elif key == '}':
+                stack.pop()
+            elif key == 'OFFSET':
+                joints[stack[-1]][2] = [float(v) for v in parts[1:4]]
+            elif key == 'CHANNELS':
+                joints[stack[-1]][3] = parts[2:2 + int(parts[1])]
+            elif key == 'MOTION':
+                break
+
+        return cls.from_joint_list([tuple(j) for j in joints])
+
+    def subset(self, joints):
+        """
+        Өгсөн joint-ууд ба тэдгээрийн өвөг гинжээс бүрдэх жижиг төлөвлөгөө
+
+        Channel-ийн баганууд эх motion-ий баганууд хэвээр тул үр дүнгийн
+        төлөвлөгөөг бүтэн motion массив дээр шууд ашиглана. Ижил joint-уудын
+        хувьд дахин бүтээхгүй, кэшээс буцаана.
+
+        Parameters:
+        -----------
+        joints : iterable of str эсвэл int
+
+        Returns:
+        --------
+        (plan, indices) : indices нь хүссэн joint-уудын шинэ төлөвлөгөө дахь индекс
+        """
+        wanted = tuple(self.index[j] if isinstance(j, str) else int(j) for j in joints)
+        cached = self._subsets.get(wanted)
+        if cached is not None:
+            return cached
+
+        keep = np.zeros(len(self), dtype=bool)
+        for j in wanted:
+            while j >= 0 and not keep[j]:
+                keep[j] = True
+                j = self.parents[j]
+
+        # DFS дараалалд эцэг нь хүүхдээсээ өмнө байдаг тул эрэмбэ хадгалагдана
+        kept = np.flatnonzero(keep)
+        remap = np.full(len(self), -1, dtype=np.intp)
+        remap[kept] = np.arange(len(kept))
+        parents = self.parents[kept]
+        parents = np.where(parents >= 0, remap[np.maximum(parents, 0)], -1)
+
+        plan = SkeletonPlan([self.names[j] for j in kept], parents, self.offsets[kept],
+                            self.position_cols[kept], self.rotation_cols[kept],
+                            self.rotation_axes[kept],
+                            [remap[j] for j in self.end_sites if keep[j]],
+                            self.num_channels, self.rotate_offsets)
+        self._subsets[wanted] = plan, remap[list(wanted)]
+        return self._subsets[wanted]
+
+
+def local_transforms(plan, motion, offsets=None):
+    """
+    Бүх joint-ийн local эргэлт, translation-ийг бүх frame-д тооцох
+
+    offsets (frames, joints, 3) өгвөл plan.offsets-ийн оронд frame бүрт
+    тусдаа ясны урт ашиглана (өөр өөр жүжигчний клипүүдийг нэг дор).
+    plan.rotate_offsets үед local = R_n ⋯ R_1 · T тул translation эргэнэ.
+
+    Returns:
+    --------
+    local_rot : (frames, joints, 3, 3)
+    local_pos : (frames, joints, 3)
+    """
+    num_frames = motion.shape[0]
+    num_joints = len(plan)
+
+    # Local translation: offset, position channel байвал түүгээр солино
+    if offsets is None:
+        offsets = plan.offsets
+    local_pos = np.broadcast_to(offsets, (num_frames, num_joints, 3)).copy()
+    has_pos = plan.position_cols >= 0
+    joint_idx, axis_idx = np.nonzero(has_pos)
+    local_pos[:, joint_idx, axis_idx] = motion[:, plan.position_cols[has_pos]]
+
+    local_rot = np.broadcast_to(np.eye(3), (num_frames, num_joints, 3, 3)).copy()
+    for k in range(3):
+        joints_k = np.flatnonzero(plan.rotation_cols[:, k] >= 0)
+        if len(joints_k) == 0:
+            continue
+        rot = axis_rotation(plan.rotation_axes[joints_k, k],
+                            motion[:, plan.rotation_cols[joints_k, k]])
+        if plan.rotate_offsets:
+            local_rot[:, joints_k] = rot @ local_rot[:, joints_k]
+        else:
+            local_rot[:, joints_k] = local_rot[:, joints_k] @ rot
+
+    if plan.rotate_offsets:
+        local_pos = (local_rot @ local_pos[..., np.newaxis])[..., 0]
+    return local_rot, local_pos
+
+
+def forward_kinematics(plan, motion, return_transforms=False, joints=None, offsets=None):
+    """
+    Бүх клипийн forward kinematics-ийг нэг дор тооцох
+
+    Frame бүрээр давтахын оронд skeleton-ий түвшин бүрийн бүх joint,
+    бүх frame-ийн матрицыг stack хийж үржүүлнэ. joints өгвөл зөвхөн
+    тэдгээрийн өвөг гинжийг (plan.subset) тооцно.
+
+    Parameters:
+    -----------
+    plan : SkeletonPlan
+    motion : np.ndarray
+        (frames, channels) эсвэл (channels,) motion өгөгдөл
+    return_transforms : bool
+        True бол (frames, joints, 4, 4) world transform-уудыг мөн буцаана
+    joints : iterable of str/int, optional
+        Зөвхөн эдгээр joint-ийг (өгсөн дарааллаар) буцаана
+    offsets : np.ndarray, optional
+        (frames, joints, 3) frame бүрийн ясны offset (plan.offsets-ийн оронд)
+
+    Returns:
+    --------
+    positions : np.ndarray
+        (frames, joints, 3) world байрлалууд
+    transforms : np.ndarray, optional
+        (frames, joints, 4, 4) world transform-ууд
+    """
+    motion = np.asarray(motion, dtype=float)
+    if motion.ndim == 1:
+        motion = motion[np.newaxis, :]
+
+    if joints is not None:
+        subset, indices = plan.subset(joints)
+        if offsets is not None:
+            offsets = np.asarray(offsets)[..., [plan.index[n] for n in subset.names], :]
+        result = forward_kinematics(subset, motion, return_transforms, offsets=offsets)
+        if not return_transforms:
+            return result[:, indices]
+        return result[0][:, indices], result[1][:, indices]
+
+    local_rot, local_pos = local_transforms(plan, motion, offsets)
+    world_rot = np.empty_like(local_rot)
+    world_pos = np.empty_like(local_pos)
+
+    for level, idx in enumerate(plan.levels):
+        if level == 0:
+            world_rot[:, idx] = local_rot[:, idx]
+            world_pos[:, idx] = local_pos[:, idx]
+            continue
+        parent = plan.parents[idx]
+        parent_rot = world_rot[:, parent]
+        world_pos[:, idx] = world_pos[:, parent] + (
+            parent_rot @ local_pos[:, idx, :, np.newaxis])[..., 0]
+        world_rot[:, idx] = parent_rot @ local_rot[:, idx]
+
+    if not return_transforms:
+        return world_pos
+
+    transforms = np.zeros(world_rot.shape[:2] + (4, 4))
+    transforms[..., :3, :3] = world_rot
+    transforms[..., :3, 3] = world_pos
+    transforms[..., 3, 3] = 1.0
+    return world_pos, transforms
+
+
+# ===== Quaternion (w, x, y, z) =====
+
+def quat_multiply(a, b):
+    """Hamilton үржвэр a ⊗ b (матрицын R(a) @ R(b)-тэй тэнцүү)"""
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=-1)
+
+
+def euler_to_quat(plan, motion):
+    """
+    Joint бүрийн Euler channel-уудыг quaternion болгох
+
+    Returns: (frames, joints, 4). Эргэлтгүй joint-д нэгж quaternion.
+    """
+    num_frames = motion.shape[0]
+    quats = np.zeros((num_frames, len(plan), 4))
+    quats[..., 0] = 1.0
+    for k in range(3):
+        joints_k = np.flatnonzero(plan.rotation_cols[:, k] >= 0)
+        if len(joints_k) == 0:
+            continue
+        half = np.radians(motion[:, plan.rotation_cols[joints_k, k]]) / 2
+        q = np.zeros(half.shape + (4,))
+        q[..., 0] = np.cos(half)
+        axes = plan.rotation_axes[joints_k, k]
+        q[:, np.arange(len(joints_k)), axes + 1] = np.sin(half)
+        quats[:, joints_k] = quat_multiply(quats[:, joints_k], q)
+    return quats
+
+
+def quat_to_matrix(q):
+    """(..., 4) quaternion → (..., 3, 3) эргэлтийн матриц"""
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], -1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], -1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], -1),
+    ], axis=-2)
+
+
+def matrix_to_euler(rot, order):
+    """
+    R = R_i @ R_j @ R_k хэлбэрийн Euler өнцгүүдийг (градус) задлах
+
+    Parameters:
+    -----------
+    rot : (..., 3, 3)
+    order : (i, j, k) ялгаатай тэнхлэгүүд (0/1/2), channel-ийн дараалал
+
+    Returns: (..., 3) өнцгүүд order-ийн дарааллаар
+    """
+    i, j, k = order
+    # Циклийн (xyz, yzx, zxy) дараалалд +1, бусдад -1
+    sign = 1.0 if (j - i) % 3 == 1 else -1.0
+    sin_b = np.clip(sign * rot[..., i, k], -1.0, 1.0)
+    b = np.arcsin(sin_b)
+    a = np.arctan2(-sign * rot[..., j, k], rot[..., k, k])
+    c = np.arctan2(-sign * rot[..., i, j], rot[..., i, i])
+
+    # Gimbal lock: a, c хамааралтай болох тул c = 0 гэж үзнэ
+    lock = np.abs(sin_b) > 1.0 - 1e-9
+    if np.any(lock):
+        a = np.where(lock, np.arctan2(sign * rot[..., k, j], rot[..., j, j]), a)
+        c = np.where(lock, 0.0, c)
+    return np.degrees(np.stack([a, b, c], axis=-1))
+
+
+def align_quat_hemisphere(quats, axis=0):
+    """q ба -q ижил эргэлт тул цаг хугацааны дагуу тэмдгийг тасралтгүй болгох"""
+    quats = np.moveaxis(quats, axis, 0)
+    dots = np.sum(quats[1:] * quats[:-1], axis=-1)
+    flips = np.cumprod(np.where(dots < 0, -1.0, 1.0), axis=0)
+    aligned = quats.copy()
+    aligned[1:] *= flips[..., np.newaxis]
+    return np.moveaxis(aligned, 0, axis)
+
+
+def quat_slerp(q0, q1, t):
+    """Quaternion-уудын spherical linear interpolation (t нь broadcast болно)"""
+    t = np.asarray(t, dtype=float)[..., np.newaxis]
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+    # Богино замаар явах
+    q1 = np.where(dot < 0, -q1, q1)
+    dot = np.abs(dot)
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    small = sin_theta < 1e-6
+    safe = np.where(small, 1.0, sin_theta)
+    w0 = np.where(small, 1.0 - t, np.sin((1.0 - t) * theta) / safe)
+    w1 = np.where(small, t, np.sin(t * theta) / safe)
+    q = w0 * q0 + w1 * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
@@ -0,0 +1,415 @@
+import json
+import os
+
+import numpy as np
+
+from bvh_fk import SkeletonPlan
+
+
+def parse_motion_text(text, num_channels, dtype=np.float64):
+    """
+    MOTION хэсгийн frame мөрүүдийг нэг дор NumPy массив болгох
+
+    Мөр бүрийг Python list болгохын оронд бүх текстийг нэг удаа
+    хөрвүүлж (frames, channels) хэмжээтэй contiguous массив үүсгэнэ.
+
+    Parameters:
+    -----------
+    text : str
+        Frame Time мөрийн дараах бүх текст
+    num_channels : int
+        Нэг frame дахь channel-ийн тоо
+    dtype : numpy dtype
+        np.float32 эсвэл np.float64 (default)
+
+    Returns:
+    --------
+    np.ndarray : (frames, num_channels)
+    """
+    values = np.fromstring(text, dtype=dtype, sep=' ')
+    if num_channels <= 0:
+        return np.empty((0, 0), dtype=dtype)
+    if values.size % num_channels != 0:
+        raise ValueError(
+            f"Motion өгөгдлийн тоо ({values.size}) channel-ийн тоонд "
+            f"({num_channels}) хуваагдахгүй байна")
+    return values.reshape(-1, num_channels)
+
+
+class BVHReader:
+    """
+    BVH файлыг бүхэлд нь санах ойд ачаалалгүй урсгалаар унших
+
+    Нээх үед HIERARCHY болон MOTION толгойг (Frames, Frame Time) уншина.
+    Frame-үүдийг дараа нь мөрөөр эсвэл массивын хэсгүүдээр (chunk) lazy
+    байдлаар авна. Файлыг нэг л удаа дамжина.
+
+    Usage:
+    ------
+    with BVHReader('shot2.bvh') as reader:
+        for line in reader.iter_frame_lines():
+            ...
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.header_lines = []      # HIERARCHY ... MOTION мөр хүртэл
+        self.frames_line = None     # "Frames: N" эх мөр
+        self.frame_time_line = None # "Frame Time: t" эх мөр
+        self.num_frames = 0         # Толгойд зарласан frame-ийн тоо
+        self.frame_time = 0.0
+        self.num_channels = 0
+        self._file = open(filename, 'r')
+        try:
+            self._read_header()
+        except BaseException:
+            # Толгой буруу бол дуудагч close() хийх боломжгүй тул энд хаана
+            self._file.close()
+            raise
+
+    def _read_header(self):
+        in_motion = False
+        for line in self._file:
+            stripped = line.strip()
+            if not in_motion:
+                self.header_lines.append(line)
+                if stripped.startswith('CHANNELS'):
+                    self.num_channels += int(stripped.split()[1])
+                elif stripped.startswith('MOTION'):
+                    in_motion = True
+            elif stripped.startswith('Frames:'):
+                self.frames_line = line
+                self.num_frames = int(stripped.split(':')[1].strip())
+            elif stripped.startswith('Frame Time:'):
+                self.frame_time_line = line
+                self.frame_time = float(stripped.split(':')[1].strip())
+                return
+
+        raise ValueError(f"{self.filename}: BVH MOTION толгой олдсонгүй")
+
+    @property
+    def hierarchy_lines(self):
+        """MOTION мөрөөс өмнөх HIERARCHY мөрүүд"""
+        return self.header_lines[:-1]
+
+    @property
+    def fps(self):
+        return 1.0 / self.frame_time
+
+    @property
+    def plan(self):
+        """HIERARCHY-аас бүтээсэн SkeletonPlan"""
+        return SkeletonPlan.from_lines(self.hierarchy_lines)
+
+    def iter_frame_lines(self):
+        """Frame мөр бүрийг (эх текстээр нь) дарааллаар yield хийх"""
+        for line in self._file:
+            if line.strip():
+                yield line if line.endswith('\n') else line + '\n'
+
+    def iter_chunks(self, chunk_size=4096, dtype=np.float64):
+        """Frame-үүдийг (<= chunk_size, channels) массивын хэсгүүдээр yield хийх"""
+        chunk = []
+        for line in self.iter_frame_lines():
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield parse_motion_text(''.join(chunk), self.num_channels, dtype)
+                chunk = []
+        if chunk:
+            yield parse_motion_text(''.join(chunk), self.num_channels, dtype)
+
+    def read_motion(self, dtype=np.float64):
+        """Үлдсэн бүх frame-ийг нэг (frames, channels) массив болгож унших"""
+        return parse_motion_text(self._file.read(), self.num_channels, dtype)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_bvh(output_file, header_lines, motion, frame_time, fmt='%.6f'):
+    """
+    Motion массивыг BVH текст болгон бичих
+
+    header_lines нь MOTION мөр хүртэлх (BVHReader.header_lines) мөрүүд.
+    """
+    with open(output_file, 'w', buffering=1 << 20) as f:
+        f.writelines(header_lines)
+        f.write(f'Frames: {len(motion)}\n')
+        f.write(f'Frame Time: {frame_time:.6f}\n')
+        np.savetxt(f, motion, fmt=fmt, delimiter=' ')
+
+
+# ===== Binary cache (.npy + .json header) =====
+
+CACHE_DIR_NAME = '.bvh_cache'
+
+
+def _cache_paths(bvh_path, dtype, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(bvh_path)), CACHE_DIR_NAME)
+    base = os.path.join(cache_dir, os.path.basename(bvh_path) + f'.{np.dtype(dtype).name}')
+    return base + '.json', base + '.npy'
+
+
+def _source_key(bvh_path):
+    st = os.stat(bvh_path)
+    return {
+        'source': os.path.abspath(bvh_path),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+    }
+
+
+def load_cached_motion(bvh_path, dtype=np.float64, cache_dir=None):
+    """
+    Кэшлэгдсэн motion-г memory-map хийж унших
+
+    Эх файлын зам, хэмжээ, mtime өөрчлөгдсөн бол кэш хүчингүй болно.
+
+    Returns:
+    --------
+    (header_lines, frame_time, motion) эсвэл None (кэш байхгүй/хуучирсан)
+        header_lines : HIERARCHY хэсгийн мөрүүд (MOTION-оос өмнө)
+        motion : (frames, channels) read-only np.memmap
+    """
+    meta_path, motion_path = _cache_paths(bvh_path, dtype, cache_dir)
+    if not (os.path.exists(meta_path) and os.path.exists(motion_path)):
+        return None
+
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('key') != _source_key(bvh_path):
+            return None
+        motion = np.load(motion_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    if motion.dtype != np.dtype(dtype):
+        return None
+    return meta['header'].splitlines(keepends=True), meta['frame_time'], motion
+
+
+def save_cached_motion(bvh_path, header_lines, frame_time, motion, cache_dir=None):
+    """
+    Parse хийсэн motion-г дараагийн уншилтад зориулж кэшлэх
+
+    Хавтас руу бичих эрхгүй бол кэшгүйгээр үргэлжилнэ.
+    """
+    meta_path, motion_path = _cache_paths(bvh_path, motion.dtype, cache_dir)
+    meta = {
+        'key': _source_key(bvh_path),
+        'header': ''.join(header_lines),
+        'frame_time': frame_time,
+    }
+
+    try:
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Хагас бичигдсэн кэш үлдэхгүйн тулд түр файлаар дамжуулна
+        tmp_motion = motion_path + '.tmp.npy'
+        np.save(tmp_motion, np.ascontiguousarray(motion))
+        os.replace(tmp_motion, motion_path)
+        tmp_meta = meta_path + '.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+    except OSError as e:
+        print(f"⚠️  Кэш хадгалж чадсангүй ({e})")
+
+
+# ===== Frame byte-offset index =====
+
+def _index_path(bvh_path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(bvh_path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(bvh_path) + '.index.npz')
+
+
+def build_frame_index(bvh_path):
+    """
+    MOTION хэсгийн frame бүрийн эхлэх byte offset-ийг нэг дамжилтаар олох
+
+    Returns:
+    --------
+    np.ndarray : (frames + 1,) int64. offsets[k] нь k-р frame-ийн (0-based)
+        эхлэл, offsets[-1] нь сүүлийн frame-ийн төгсгөл. Иймд [a, b] frame-үүд
+        файлын offsets[a]:offsets[b + 1] байтад байрлана.
+    """
+    offsets = []
+    end = 0
+    pos = 0
+    in_motion = False
+    with open(bvh_path, 'rb') as f:
+        for line in f:
+            stripped = line.strip()
+            if in_motion:
+                if stripped:
+                    offsets.append(pos)
+                    end = pos + len(line)
+            elif stripped.startswith(b'Frame Time:'):
+                in_motion = True
+                end = pos + len(line)
+            pos += len(line)
+
+    if not in_motion:
+        raise ValueError(f"{bvh_path}: BVH MOTION толгой олдсонгүй")
+    offsets.append(end)
+    return np.array(offsets, dtype=np.int64)
+
+
+def load_frame_index(bvh_path, cache_dir=None):
+    """
+    Frame offset index-ийг кэшээс авах, байхгүй/хуучирсан бол бүтээж хадгалах
+
+    Эх файлын зам, хэмжээ, mtime-аар түлхүүрлэнэ (load_cached_motion-тэй ижил).
+    """
+    index_path = _index_path(bvh_path, cache_dir)
+    key = _source_key(bvh_path)
+
+    if os.path.exists(index_path):
+        try:
+            with np.load(index_path) as data:
+                if (str(data['source']) == key['source']
+                        and int(data['size']) == key['size']
+                        and int(data['mtime_ns']) == key['mtime_ns']):
+                    return data['offsets']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    offsets = build_frame_index(bvh_path)
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        tmp_path = index_path + '.tmp.npz'
+        np.savez(tmp_path, offsets=offsets, **key)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"⚠️  Frame index хадгалж чадсангүй ({e})")
+    return offsets
+
+
+def copy_frame_range(bvh_path, dst, offsets, start, end, chunk_size=1 << 20):
+    """
+    [start, end] frame-үүдийг (0-based, end орно) эх файлаас байтаар хуулах
+
+    Мөрүүдийг задлахгүйгээр seek хийж нэг үргэлжилсэн хэсгийг хуулна.
+
+    Parameters:
+    -----------
+    dst : binary file object
+    offsets : load_frame_index-ийн буцаасан массив
+    """
+    begin = int(offsets[start])
+    remaining = int(offsets[end + 1]) - begin
+    last = b''
+    with open(bvh_path, 'rb') as src:
+        src.seek(begin)
+        while remaining > 0:
+            block = src.read(min(chunk_size, remaining))
+            if not block:
+                break
+            dst.write(block)
+            remaining -= len(block)
+            last = block
+    # Файлын сүүлийн мөр шинэ мөргүй дуусч болно
+    if last and not last.endswith(b'\n'):
+        dst.write(b'\n')
+
+
+# ===== Scene bounds cache =====
+
+def _bounds_path(bvh_path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(bvh_path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(bvh_path) + '.bounds.json')
+
+
+def load_cached_bounds(bvh_path, cache_dir=None):
+    """
+    Клипийн кэшлэгдсэн bounds-ийг унших
+
+    Returns:
+    --------
+    dict эсвэл None (кэш байхгүй/хуучирсан)
+        'min', 'max' : [x, y, z]
+        'percentiles' : {str(q): [[x, y, z], [x, y, z]]}
+    """
+    bounds_path = _bounds_path(bvh_path, cache_dir)
+    if not os.path.exists(bounds_path):
+        return None
+    try:
+        with open(bounds_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('key') != _source_key(bvh_path):
+        return None
+    return data
+
+
+def save_cached_bounds(bvh_path, bounds, cache_dir=None):
+    """load_cached_bounds-ийн dict-ийг эх файлын түлхүүртэй хадгалах"""
+    bounds_path = _bounds_path(bvh_path, cache_dir)
+    data = dict(bounds, key=_source_key(bvh_path))
+    try:
+        os.makedirs(os.path.dirname(bounds_path), exist_ok=True)
+        tmp_path = bounds_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, bounds_path)
+    except OSError as e:
+        print(f"⚠️  Bounds хадгалж чадсангүй ({e})")
+
+
+# ===== Per-clip feature cache =====
+
+def _features_path(bvh_path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(bvh_path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(bvh_path) + '.features.npz')
+
+
+def load_cached_features(bvh_path, names, cache_dir=None):
+    """
+    Клипийн кэшлэгдсэн frame бүрийн feature-уудыг унших
+
+    Эх файлын түлхүүр эсвэл feature-уудын жагсаалт өөрчлөгдсөн бол хүчингүй.
+
+    Returns:
+    --------
+    dict (feature нэр -> (frames, ...) массив) эсвэл None
+    """
+    features_path = _features_path(bvh_path, cache_dir)
+    if not os.path.exists(features_path):
+        return None
+
+    key = _source_key(bvh_path)
+    try:
+        with np.load(features_path) as data:
+            if (str(data['source']) != key['source']
+                    or int(data['size']) != key['size']
+                    or int(data['mtime_ns']) != key['mtime_ns']
+                    or list(data['names']) != list(names)):
+                return None
+            return {name: data['feature_' + name] for name in names}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cached_features(bvh_path, features, cache_dir=None):
+    """load_cached_features-ийн dict-ийг эх файлын түлхүүртэй хадгалах"""
+    features_path = _features_path(bvh_path, cache_dir)
+    arrays = {'feature_' + name: values for name, values in features.items()}
+    try:
+        os.makedirs(os.path.dirname(features_path), exist_ok=True)
+        tmp_path = features_path + '.tmp.npz'
+        np.savez(tmp_path, names=np.array(list(features)), **arrays,
+                 **_source_key(bvh_path))
+        os.replace(tmp_path, features_path)
+    except OSError as e:
+        print(f"⚠️  Feature хадгалж чадсангүй ({e})")
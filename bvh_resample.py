@@ -0,0 +1,133 @@
+import numpy as np
+
+from bvh_fk import (align_quat_hemisphere, euler_to_quat, matrix_to_euler,
+                    quat_slerp, quat_to_matrix)
+from bvh_io import BVHReader, write_bvh
+
+
+def gaussian_lowpass(data, sigma, axis=0):
+    """
+    Цаг хугацааны тэнхлэгийн дагуу Гауссын low-pass шүүлтүүр
+
+    Ирмэгийг эхний/сүүлийн утгаар дүүргэнэ. Kernel-ийн урт (~6σ) бага тул
+    shift хийсэн массивуудыг жинлэн нэмж бүх channel-ийг нэг дор шүүнэ.
+    """
+    radius = int(np.ceil(3 * sigma))
+    if radius < 1:
+        return np.asarray(data, dtype=float)
+
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    kernel /= kernel.sum()
+
+    data = np.moveaxis(np.asarray(data, dtype=float), axis, 0)
+    n = len(data)
+    padded = np.concatenate([np.repeat(data[:1], radius, axis=0), data,
+                             np.repeat(data[-1:], radius, axis=0)])
+    out = np.zeros_like(data)
+    for i, w in enumerate(kernel):
+        out += w * padded[i:i + n]
+    return np.moveaxis(out, 0, axis)
+
+
+def sample_positions(num_frames, original_fps, target_fps):
+    """
+    target_fps-ийн цаг хугацааны цэгүүдийг эх frame-ийн байрлал болгох
+
+    Хугацаа нь эхний frame-ээс эхэлж 1/target_fps алхамтай, сүүлийн
+    frame-ээс хэтрэхгүй тул гаралтын үргэлжлэх хугацаа эхтэй тэнцүү.
+
+    Returns:
+    --------
+    (i0, i1, w) : t хугацааны pose = (1 - w) * frame[i0] + w * frame[i1]
+    """
+    ratio = original_fps / target_fps
+    num_out = int(np.floor((num_frames - 1) / ratio + 1e-9)) + 1 if num_frames else 0
+    src = np.arange(num_out) * ratio
+    i0 = np.minimum(np.floor(src).astype(np.intp), max(num_frames - 1, 0))
+    i1 = np.minimum(i0 + 1, max(num_frames - 1, 0))
+    return i0, i1, src - i0
+
+
+def resample_motion(plan, motion, original_fps, target_fps, antialias=True):
+    """
+    Motion массивыг дурын FPS руу interpolation хийж хөрвүүлэх
+
+    - Position channel: шугаман interpolation
+    - 3 тэнхлэгийн эргэлт: quaternion болгож slerp хийгээд joint-ийн
+      channel-ийн дарааллаар Euler руу буцаана
+    - Бусад эргэлт (1-2 channel): unwrap хийсэн өнцгийг шугаманаар
+    - antialias=True ба FPS буурах үед decimation-оос өмнө Гауссын
+      low-pass (sigma ≈ 0.265 * ratio, target Nyquist орчим -3dB)
+
+    Parameters:
+    -----------
+    plan : SkeletonPlan
+    motion : (frames, channels)
+    original_fps, target_fps : float
+
+    Returns:
+    --------
+    np.ndarray : (new_frames, channels). Хугацааны хувьд эхний frame-ээс
+        эхэлж, сүүлийн frame-ээс хэтрэхгүй 1/target_fps алхамтай.
+    """
+    motion = np.asarray(motion, dtype=float)
+    num_frames = len(motion)
+    if num_frames < 2:
+        return motion.copy()
+
+    ratio = original_fps / target_fps
+    i0, i1, w = sample_positions(num_frames, original_fps, target_fps)
+
+    # Эргэлтийн channel-уудыг 360°-ийн үсрэлтгүй болгох
+    rot_cols = plan.rotation_cols[plan.rotation_cols >= 0]
+    linear = motion.copy()
+    linear[:, rot_cols] = np.unwrap(motion[:, rot_cols], period=360, axis=0)
+
+    quats = align_quat_hemisphere(euler_to_quat(plan, motion))
+
+    if antialias and ratio > 1:
+        sigma = 0.265 * ratio
+        linear = gaussian_lowpass(linear, sigma)
+        quats = gaussian_lowpass(quats, sigma)
+        quats /= np.linalg.norm(quats, axis=-1, keepdims=True)
+
+    out = (1.0 - w)[:, np.newaxis] * linear[i0] + w[:, np.newaxis] * linear[i1]
+
+    # 3 тэнхлэгтэй joint-уудыг эргэлтийн дарааллаар нь бүлэглэж Euler руу буцаах
+    full = np.flatnonzero((plan.rotation_axes >= 0).all(axis=1))
+    if len(full):
+        rot = quat_to_matrix(quat_slerp(quats[i0][:, full], quats[i1][:, full],
+                                        w[:, np.newaxis]))
+        orders = plan.rotation_axes[full]
+        for order in np.unique(orders, axis=0):
+            if len(set(order)) != 3:
+                continue
+            group = np.flatnonzero((orders == order).all(axis=1))
+            cols = plan.rotation_cols[full[group]]
+            angles = matrix_to_euler(rot[:, group], tuple(order))
+            # Шугаман interpolation-д хамгийн ойр 360°-ийн салбарыг сонгоно
+            ref = out[:, cols]
+            out[:, cols] = ref + (angles - ref + 180.0) % 360.0 - 180.0
+
+    return out
+
+
+def resample_bvh_interp(input_file, output_file, original_fps=None, target_fps=72,
+                        antialias=True):
+    """
+    BVH файлыг interpolation-той resample хийж бичих
+
+    original_fps өгөөгүй бол файлын Frame Time-аас авна.
+    Returns: (эх frame-ийн тоо, шинэ frame-ийн тоо)
+    """
+    with BVHReader(input_file) as reader:
+        plan = reader.plan
+        header = reader.header_lines
+        if original_fps is None:
+            original_fps = reader.fps
+        motion = reader.read_motion()
+
+    new_motion = resample_motion(plan, motion, original_fps, target_fps, antialias)
+    write_bvh(output_file, header, new_motion, 1.0 / target_fps)
+    return len(motion), len(new_motion)
@@ -0,0 +1,288 @@
+import argparse
+import time
+
+import numpy as np
+
+from bvh_corpus import MotionCorpus
+
+# Хуруунуудыг орхисон биеийн гол joint-ууд (эхнийх нь ROOT)
+DEFAULT_JOINTS = (
+    'Hips', 'Spine1', 'Head',
+    'LeftArm', 'LeftForeArm', 'LeftHand',
+    'RightArm', 'RightForeArm', 'RightHand',
+    'LeftUpLeg', 'LeftLeg', 'LeftFoot',
+    'RightUpLeg', 'RightLeg', 'RightFoot',
+)
+
+
+def heading(root_transforms):
+    """ROOT-ийн local Z тэнхлэгийн XZ хавтгай дахь чиглэл (радиан), (frames,)"""
+    forward = root_transforms[:, :3, 2]
+    return np.arctan2(forward[:, 0], forward[:, 2])
+
+
+def embed_windows(positions, yaw, starts, window, stride):
+    """
+    Цонх бүрийг байрлал, чиглэлээс үл хамаарах вектор болгох
+
+    Цонхны эхний frame-ийн ROOT-ийн XZ байрлалыг хасч, ROOT-ийн чиглэлийг
+    +Z руу эргүүлнэ. Цонхноос stride алхамтай frame-үүдийг авна.
+
+    Parameters:
+    -----------
+    positions : (frames, joints, 3), joints[0] нь ROOT
+    yaw : (frames,) heading()-ийн үр дүн
+    starts : (windows,) цонхны эхлэх frame-ууд
+    window, stride : frame-ээр
+
+    Returns:
+    --------
+    (windows, (window // stride) * joints * 3) float32
+    """
+    frames = starts[:, np.newaxis] + np.arange(0, window, stride)
+    points = positions[frames]                      # (w, t, joints, 3)
+    origin = positions[starts, 0]                   # (w, 3)
+    points = points - origin[:, np.newaxis, np.newaxis] * np.array([1.0, 0.0, 1.0])
+
+    c = np.cos(yaw[starts])[:, np.newaxis, np.newaxis]
+    s = np.sin(yaw[starts])[:, np.newaxis, np.newaxis]
+    x, z = points[..., 0], points[..., 2]
+    points = np.stack([c * x - s * z, points[..., 1], s * x + c * z], axis=-1)
+    return points.reshape(len(starts), -1).astype(np.float32)
+
+
+def _sq_norms(vectors):
+    return np.einsum('ij,ij->i', vectors, vectors)
+
+
+def kmeans(vectors, n_clusters, iterations=20, seed=0):
+    """
+    Lloyd-ийн k-means (зай нь batched матриц үржвэрээр)
+
+    Returns:
+    --------
+    (centroids (n_clusters, dim), labels (n,))
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    norms = _sq_norms(vectors)
+    for _ in range(iterations):
+        dist = norms[:, np.newaxis] - 2 * vectors @ centroids.T + _sq_norms(centroids)
+        labels = dist.argmin(axis=1)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        # Хоосон болсон кластерыг хуучин төвд нь үлдээнэ
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, np.newaxis]
+    return centroids, labels
+
+
+class MotionIndex:
+    """
+    Корпусын тогтмол урттай цонхнуудын k-NN хайлтын индекс
+
+    Вектор бүр нэг цонх (embed_windows). Хайлт нь бүх вектортой
+    ||q||² - 2 q·x + ||x||² зайг нэг матриц үржвэрээр тооцно. Том корпуст
+    train_quantizer() нь векторуудыг кластерт хувааж, хайлт зөвхөн
+    хамгийн ойрын nprobe кластерыг шалгана.
+
+    Usage:
+    ------
+    index = MotionIndex.from_corpus(MotionCorpus.from_folder('DATA'))
+    for match in index.query('vnuman_1c1', 3.0, k=5):
+        print(match)
+    """
+
+    def __init__(self, vectors, clip_ids, starts, clips, window, stride, fps, joints):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.norms = _sq_norms(self.vectors)
+        self.clip_ids = np.asarray(clip_ids, dtype=np.intp)
+        self.starts = np.asarray(starts, dtype=np.intp)
+        self.clips = list(clips)
+        self.window = window
+        self.stride = stride
+        self.fps = fps
+        self.joints = tuple(joints)
+        self.centroids = None
+        self.lists = None
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @classmethod
+    def from_corpus(cls, corpus, seconds=2.0, step=6, stride=6, joints=DEFAULT_JOINTS):
+        """
+        Корпусын клип бүрээс step frame тутамд seconds урттай цонх авах
+
+        Цонх клипийн хилийг давахгүй.
+        """
+        window = int(round(seconds * corpus.fps))
+        positions, transforms = corpus.forward_kinematics(joints=joints, return_transforms=True)
+        yaw = heading(transforms[:, 0])
+
+        clip_ids, starts = [], []
+        for k in range(len(corpus)):
+            first, last = corpus.starts[k], corpus.starts[k + 1]
+            clip_starts = np.arange(first, last - window + 1, step)
+            clip_ids.append(np.full(len(clip_starts), k))
+            starts.append(clip_starts)
+        clip_ids = np.concatenate(clip_ids)
+        starts = np.concatenate(starts)
+
+        vectors = embed_windows(positions, yaw, starts, window, stride)
+        return cls(vectors, clip_ids, starts - corpus.starts[clip_ids],
+                   [clip['name'] for clip in corpus.clips], window, stride,
+                   corpus.fps, joints)
+
+    def train_quantizer(self, n_lists=None, iterations=20, seed=0):
+        """Coarse quantizer: векторуудыг n_lists (default √n) кластерт хуваах"""
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(self))))
+        self.centroids, labels = kmeans(self.vectors, n_lists, iterations, seed)
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(n_lists + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(n_lists)]
+
+    def search(self, queries, k=10, nprobe=None, exclude=None):
+        """
+        Асуулга бүрийн k хамгийн ойрын цонх
+
+        Parameters:
+        -----------
+        queries : (q, dim) эсвэл (dim,)
+        nprobe : int, optional
+            Quantizer сургасан бол зөвхөн хамгийн ойрын nprobe кластерыг шалгана
+        exclude : (q, len(self)) bool, optional
+            True бол тухайн асуулгад тооцохгүй (жишээ нь өөртэйгөө давхцах)
+
+        Returns:
+        --------
+        (distances (q, k), ids (q, k)) : зайгаар өсөх дарааллаар. Зай нь
+            вектор бүрийн элементийн RMS, олдоогүй байрлалд inf/-1
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if nprobe is None or self.centroids is None:
+            dist = (_sq_norms(queries)[:, np.newaxis] - 2 * queries @ self.vectors.T
+                    + self.norms)
+            if exclude is not None:
+                dist[exclude] = np.inf
+            return self._top_k(dist, k)
+
+        # Зөвхөн хамгийн ойрын nprobe кластерын мөрүүдтэй зай тооцно
+        coarse = _sq_norms(self.centroids) - 2 * queries @ self.centroids.T
+        nprobe = min(nprobe, len(self.lists))
+        probe = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        k = min(k, len(self))
+        distances = np.full((len(queries), k), np.inf)
+        ids = np.full((len(queries), k), -1, dtype=np.intp)
+        for q, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[c] for c in probe[q]])
+            if len(candidates) == 0:
+                continue
+            dist = (_sq_norms(query[np.newaxis]) - 2 * self.vectors[candidates] @ query
+                    + self.norms[candidates])
+            if exclude is not None:
+                dist[exclude[q, candidates]] = np.inf
+            found, local = self._top_k(dist[np.newaxis], k)
+            count = found.shape[1]
+            distances[q, :count] = found[0]
+            ids[q, :count] = np.where(local[0] >= 0, candidates[local[0]], -1)
+        return distances, ids
+
+    def _top_k(self, dist, k):
+        """(q, n) квадрат зайнаас эрэмбэлсэн k хамгийн бага (RMS зай, багана)"""
+        k = min(k, dist.shape[1])
+        ids = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(dist, ids, axis=1)
+        order = np.argsort(top, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        distances = np.sqrt(np.maximum(top, 0) / self.vectors.shape[1])
+        ids = np.where(np.isfinite(top), ids, -1)
+        return distances, ids
+
+    def window_id(self, clip, seconds):
+        """Клипийн (нэр эсвэл индекс) seconds-т хамгийн ойр эхэлсэн цонх"""
+        k = self.clips.index(clip) if isinstance(clip, str) else int(clip)
+        candidates = np.flatnonzero(self.clip_ids == k)
+        if len(candidates) == 0:
+            raise ValueError(f"{self.clips[k]}: цонх багтахааргүй богино клип")
+        frame = seconds * self.fps
+        return candidates[np.abs(self.starts[candidates] - frame).argmin()]
+
+    def query(self, clip, seconds, k=10, nprobe=None, skip_overlap=True):
+        """
+        Клипийн seconds-ээс эхлэх цонхтой төстэй цонхнуудыг эрэмбэлэх
+
+        skip_overlap бол ижил клипийн давхцах цонхнуудыг алгасна.
+
+        Returns:
+        --------
+        list of dict : 'clip', 'start' (сек), 'distance'
+        """
+        query_id = self.window_id(clip, seconds)
+        exclude = None
+        if skip_overlap:
+            exclude = ((self.clip_ids == self.clip_ids[query_id])
+                       & (np.abs(self.starts - self.starts[query_id]) < self.window))
+            exclude = exclude[np.newaxis]
+        distances, ids = self.search(self.vectors[query_id], k, nprobe, exclude)
+        return [{'clip': self.clips[self.clip_ids[i]],
+                 'start': self.starts[i] / self.fps,
+                 'distance': float(d)}
+                for d, i in zip(distances[0], ids[0]) if i >= 0]
+
+    # ===== Хадгалах =====
+
+    def save(self, path):
+        arrays = dict(vectors=self.vectors, clip_ids=self.clip_ids, starts=self.starts,
+                      clips=np.array(self.clips), joints=np.array(self.joints),
+                      window=self.window, stride=self.stride, fps=self.fps)
+        if self.centroids is not None:
+            arrays['centroids'] = self.centroids
+            arrays['list_sizes'] = np.array([len(ids) for ids in self.lists])
+            arrays['list_ids'] = np.concatenate(self.lists)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(data['vectors'], data['clip_ids'], data['starts'],
+                        [str(c) for c in data['clips']], int(data['window']),
+                        int(data['stride']), float(data['fps']),
+                        [str(j) for j in data['joints']])
+            if 'centroids' in data:
+                index.centroids = data['centroids']
+                bounds = np.concatenate([[0], np.cumsum(data['list_sizes'])])
+                ids = data['list_ids']
+                index.lists = [ids[bounds[c]:bounds[c + 1]] for c in range(len(bounds) - 1)]
+        return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Корпусаас төстэй хөдөлгөөний цонх хайх")
+    parser.add_argument("clip", help="Асуулгын клип, жишээ нь vnuman_1c1")
+    parser.add_argument("start", type=float, help="Цонхны эхлэл (сек)")
+    parser.add_argument("--folder", default="DATA")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Цонхны урт (сек)")
+    parser.add_argument("--nprobe", type=int, default=None,
+                        help="Coarse quantizer ашиглаж шалгах кластерын тоо")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = MotionIndex.from_corpus(MotionCorpus.from_folder(args.folder), args.seconds)
+    if args.nprobe is not None:
+        index.train_quantizer()
+    print(f"📂 {len(index)} цонх, {index.vectors.shape[1]} хэмжээс "
+          f"({time.perf_counter() - start:.2f} сек)")
+
+    start = time.perf_counter()
+    matches = index.query(args.clip, args.start, args.k, args.nprobe)
+    print(f"🔍 {args.clip} @ {args.start:.2f} сек ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    for rank, match in enumerate(matches, 1):
+        print(f"  {rank:>2}. {match['clip']:<16} {match['start']:7.2f} сек  "
+              f"{match['distance']:.3f}")
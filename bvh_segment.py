@@ -1,6 +1,143 @@
+import argparse
+import csv
+import json
 import os
+from contextlib import ExitStack
+from itertools import islice
 
-def split_bvh_with_data_folder(input_file, segments, output_folder='data'):
+from bvh_io import BVHReader, copy_frame_range, load_frame_index
+
+def load_segments(path):
+    """
+    Segment хүснэгтийг CSV эсвэл JSON файлаас унших
+
+    CSV: мөр бүр "start,end,name" (толгой мөр байж болно)
+    JSON: [[start, end, name], ...] эсвэл [{"start": .., "end": .., "name": ..}, ...]
+
+    Returns: [(start, end, name), ...]
+    """
+    segments = []
+    if path.lower().endswith('.json'):
+        with open(path, 'r') as f:
+            for item in json.load(f):
+                if isinstance(item, dict):
+                    item = (item['start'], item['end'], item['name'])
+                start, end, name = item
+                segments.append((int(start), int(end), str(name)))
+    else:
+        with open(path, 'r', newline='') as f:
+            for row in csv.reader(f):
+                if not row or row[0].strip().startswith('#'):
+                    continue
+                try:
+                    start, end = int(row[0]), int(row[1])
+                except ValueError:
+                    continue  # Толгой мөр
+                segments.append((start, end, row[2].strip()))
+    return segments
+
+
+def save_segments(path, segments):
+    """
+    Segment хүснэгтийг load_segments-ийн унших хэлбэрээр (.csv/.json) бичих
+    """
+    if path.lower().endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump([{'start': int(start), 'end': int(end), 'name': name}
+                       for start, end, name in segments], f, indent=2, ensure_ascii=False)
+    else:
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['start', 'end', 'name'])
+            writer.writerows((int(start), int(end), name) for start, end, name in segments)
+
+
+def _check_segments(segments, total_frames):
+    """Хязгаар шалгаж, зөв segment-үүдийг (idx, start_idx, end_idx, name) болгох"""
+    valid = []
+    for idx, (start, end, name) in enumerate(segments, 1):
+        # Frame индекс (1-based → 0-based)
+        start_idx = start - 1
+        end_idx = end - 1
+        
+        # Хязгаар шалгах
+        if start_idx < 0:
+            print(f"⚠️  [{idx}] {name}: Start frame хэт бага ({start})")
+            continue
+        
+        if end_idx >= total_frames:
+            print(f"⚠️  [{idx}] {name}: End frame хэт их ({end} > {total_frames})")
+            continue
+        
+        if start_idx >= end_idx:
+            print(f"⚠️  [{idx}] {name}: Start >= End ({start} >= {end})")
+            continue
+        
+        valid.append((idx, start_idx, end_idx, name))
+    return valid
+
+
+def _remove_outputs(paths):
+    """Дуусаагүй гаралтын файлуудыг устгах"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _write_single_pass(input_file, valid, output_folder, motion_header, buffer_size):
+    """
+    Эх файлыг нэг удаа дамжиж frame мөр бүрийг давхцаж буй бүх segment руу бичих
+
+    Алдаа гарвал бүх файлыг хааж, дуусаагүй segment-үүдийн файлыг устгана.
+    Эх файл толгойд зарласнаас цөөн frame-тэй бол дуусаагүй segment-үүдийн
+    файлыг мөн устгана.
+
+    Returns:
+    --------
+    (incomplete, frames_read) : бичиж чадаагүй segment-үүдийн idx-ийн set,
+        уншсан frame-ийн тоо
+    """
+    # Эхлэх frame-ээр эрэмбэлж дараалан нээнэ; зэрэг нээлттэй файлын тоо
+    # нь давхцаж буй segment-ийн тоогоор хязгаарлагдана
+    pending = sorted(valid, key=lambda seg: seg[1], reverse=True)
+    active = []
+    frames_read = 0
+    try:
+        with ExitStack() as stack, BVHReader(input_file) as reader:
+            for frame_idx, line in enumerate(reader.iter_frame_lines()):
+                frames_read = frame_idx + 1
+                while pending and pending[-1][1] == frame_idx:
+                    idx, start_idx, end_idx, name = pending.pop()
+                    output_file = os.path.join(output_folder, f"{name}.bvh")
+                    f = stack.enter_context(open(output_file, 'w', buffering=buffer_size))
+                    active.append((idx, end_idx, f, output_file))
+                    f.write(motion_header(end_idx - start_idx + 1))
+
+                for _, _, f, _ in active:
+                    f.write(line)
+
+                if any(end_idx == frame_idx for _, end_idx, _, _ in active):
+                    for _, end_idx, f, _ in active:
+                        if end_idx == frame_idx:
+                            f.close()
+                    active = [item for item in active if item[1] != frame_idx]
+
+                if not active and not pending:
+                    break
+    except BaseException:
+        _remove_outputs(output_file for _, _, _, output_file in active)
+        raise
+
+    # Толгойд зарласан frame-ийн тооноос дутуу файл үлдээхгүй
+    _remove_outputs(output_file for _, _, _, output_file in active)
+    incomplete = {item[0] for item in active} | {seg[0] for seg in pending}
+    return incomplete, frames_read
+
+
+def split_bvh_with_data_folder(input_file, segments, output_folder='data',
+                               mode='single_pass', buffer_size=1 << 20):
     """
     BVH файлыг segment-үүдэд тасалж 'data' folder-т хадгалах
     
@@ -9,92 +146,103 @@ def split_bvh_with_data_folder(input_file, segments, output_folder='data'):
     input_file : str
         Эх BVH файлын нэр
     segments : list of tuples
-        [(start, end, name), ...] жагсаалт
+        [(start, end, name), ...] жагсаалт (frame 1-ээс эхэлнэ, end орно)
     output_folder : str
         Хадгалах folder-ын нэр (default: 'data')
+    mode : str
+        'single_pass' - эх файлыг нэг удаа дамжиж бүх segment-ийг зэрэг бичнэ
+        'index' - frame offset index (кэшлэгдсэн) ашиглан segment бүрийг
+                  seek + байт хуулбараар бичнэ
+        'stream' - segment бүрт эх файлыг мөрөөр урсгалаар уншина
+    buffer_size : int
+        Гаралтын файлуудын write buffer (byte)
     """
+    if mode not in ('single_pass', 'index', 'stream'):
+        raise ValueError(f"Үл мэдэгдэх mode: {mode}")
     
     # Data folder үүсгэх
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
         print(f"📁 Folder үүсгэсэн: {output_folder}/")
     
-    # BVH файл унших
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
-    
-    # HIERARCHY хэсгийг олох
-    motion_index = 0
-    for i, line in enumerate(lines):
-        if line.strip().startswith('MOTION'):
-            motion_index = i
-            break
-    
-    # Header хэсэг (HIERARCHY + MOTION declaration)
-    header = lines[:motion_index + 1]
+    # BVH файлын толгойг унших
+    with BVHReader(input_file) as reader:
+        # Header хэсэг (HIERARCHY + MOTION declaration)
+        header = reader.header_lines
+        
+        # Frame Time мөр
+        frame_time_line = reader.frame_time_line
+        frame_time = reader.frame_time
+        fps = 1.0 / frame_time
+        
+        total_frames = reader.num_frames
     
-    # Frame Time мөр
-    frame_time_line = lines[motion_index + 2]
-    frame_time = float(frame_time_line.split(':')[1].strip())
-    fps = 1.0 / frame_time
+    # Frame → byte offset index (анх удаа нэг дамжилтаар бүтээгдэж кэшлэгдэнэ)
+    offsets = None
+    if mode == 'index':
+        offsets = load_frame_index(input_file)
+        total_frames = len(offsets) - 1
     
-    # Motion data хэсэг
-    motion_start_index = motion_index + 3
-    motion_data = lines[motion_start_index:]
+    def motion_header(num_frames):
+        return ''.join(header) + f"Frames: {num_frames}\n" + frame_time_line
     
     print(f"\n📊 Эх файл: {input_file}")
-    print(f"   Нийт frames: {len(motion_data)}")
+    print(f"   Нийт frames: {total_frames}")
     print(f"   FPS: {fps:.2f}")
     print(f"   Frame Time: {frame_time:.6f}")
     print(f"\n{'#':<4} {'Нэр':<20} {'Start':<8} {'End':<8} {'Frames':<8} {'Секунд':<10}")
     print("=" * 70)
     
+    valid = _check_segments(segments, total_frames)
+    
+    incomplete, frames_read = set(), total_frames
+    if mode == 'single_pass':
+        incomplete, frames_read = _write_single_pass(input_file, valid, output_folder,
+                                                     motion_header, buffer_size)
+    
     # Segment бүрийг боловсруулах
-    success_count = 0
-    for idx, (start, end, name) in enumerate(segments, 1):
-        # Frame индекс (1-based → 0-based)
-        start_idx = start - 1
-        end_idx = end - 1
-        
-        # Хязгаар шалгах
-        if start_idx < 0:
-            print(f"⚠️  [{idx}] {name}: Start frame хэт бага ({start})")
-            continue
-        
-        if end_idx >= len(motion_data):
-            print(f"⚠️  [{idx}] {name}: End frame хэт их ({end} > {len(motion_data)})")
-            continue
-        
-        if start_idx >= end_idx:
-            print(f"⚠️  [{idx}] {name}: Start >= End ({start} >= {end})")
-            continue
-        
-        # Segment өгөгдөл авах
-        segment_data = motion_data[start_idx:end_idx + 1]
-        num_frames = len(segment_data)
+    saved = 0
+    for idx, start_idx, end_idx, name in valid:
+        num_frames = end_idx - start_idx + 1
         duration = num_frames * frame_time
-        
-        # Шинэ файл бичих
         output_file = os.path.join(output_folder, f"{name}.bvh")
         
-        with open(output_file, 'w') as f:
-            # Header бичих
-            f.writelines(header)
-            
-            # Frames тоо
-            f.write(f"Frames: {num_frames}\n")
-            
-            # Frame Time
-            f.write(frame_time_line)
+        if idx in incomplete:
+            # Эх файл толгойд зарласнаас эрт дууссан
+            print(f"⚠️  [{idx}] {name}: End frame хэт их ({end_idx + 1} > {frames_read})")
+            continue
+        
+        if mode == 'index':
+            with open(output_file, 'wb') as f:
+                # Header, Frames тоо, Frame Time
+                f.write(motion_header(num_frames).encode())
+                
+                # Motion data: эх файлаас seek хийж байтаар хуулах
+                copy_frame_range(input_file, f, offsets, start_idx, end_idx)
+        elif mode == 'stream':
+            with open(output_file, 'w', buffering=buffer_size) as f:
+                # Header, Frames тоо, Frame Time
+                f.write(motion_header(num_frames))
+                
+                # Motion data: эх файлаас урсгалаар зөвхөн хэрэгтэй хэсгийг хуулах
+                copied = 0
+                with BVHReader(input_file) as reader:
+                    for line in islice(reader.iter_frame_lines(), start_idx, end_idx + 1):
+                        f.write(line)
+                        copied += 1
             
-            # Motion data
-            f.writelines(segment_data)
+            if copied < num_frames:
+                # Эх файл толгойд зарласнаас эрт дууссан
+                _remove_outputs([output_file])
+                print(f"⚠️  [{idx}] {name}: End frame хэт их "
+                      f"(эх файл {end_idx + 1} frame хүрэлгүй дууссан)")
+                continue
         
-        success_count += 1
-        print(f"✅ [{idx}] {name:<20} {start:<8} {end:<8} {num_frames:<8} {duration:<10.2f}")
+        saved += 1
+        print(f"✅ [{idx}] {name:<20} {start_idx + 1:<8} {end_idx + 1:<8} {num_frames:<8} {duration:<10.2f}")
     
     print("=" * 70)
-    print(f"🎉 Амжилттай: {success_count}/{len(segments)} segment хадгалагдлаа")
+    print(f"🎉 Амжилттай: {saved}/{len(segments)} segment хадгалагдлаа")
     print(f"📂 Байршил: {output_folder}/\n")
 
 
@@ -123,5 +271,25 @@ segments = [
     (11446, 11938, 'vnuman_2x6'),
 ]
 
-# Функц дуудах
-split_bvh_with_data_folder('shot2.bvh', segments, output_folder='data')
\ No newline at end of file
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="BVH файлыг segment-үүдэд таслах")
+    arg_parser.add_argument("input", nargs="?", default="shot2.bvh",
+                            help="Эх BVH файл (default: shot2.bvh)")
+    arg_parser.add_argument("-s", "--segments", default=None,
+                            help="Segment хүснэгт (.csv эсвэл .json). Өгөөгүй бол дээрх жагсаалт")
+    arg_parser.add_argument("--auto", action="store_true",
+                            help="Segment-үүдийг амралтаар нь автоматаар олох (bvh_autosegment)")
+    arg_parser.add_argument("-o", "--output", default="data",
+                            help="Гаралтын хавтас (default: data)")
+    arg_parser.add_argument("--mode", choices=["single_pass", "index", "stream"],
+                            default="single_pass")
+    args = arg_parser.parse_args()
+    
+    if args.segments:
+        segments = load_segments(args.segments)
+    elif args.auto:
+        from bvh_autosegment import propose_segments
+        segments = propose_segments(args.input)
+    
+    # Функц дуудах
+    split_bvh_with_data_folder(args.input, segments, output_folder=args.output, mode=args.mode)
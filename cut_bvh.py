@@ -1,107 +1,235 @@
+import argparse
 import os
 import sys
+from contextlib import ExitStack
+from itertools import islice
+
+from bvh_io import BVHReader
+
+
+def parse_range(text, frame_time):
+    """
+    "start:end" мужийг frame индекс болгох
+
+    Тоо нь секунд, 'f' дагавартай бол frame (0-ээс эхэлнэ). Аль нэг тал
+    хоосон бол файлын эхлэл/төгсгөл. "=output.bvh" залгавал гаралтын нэр.
+
+    Жишээ: "0:60", "12.5:20=excerpt.bvh", "1200f:4800f", "30:"
+
+    Returns:
+    --------
+    (start, end, output_file) : end орохгүй, None = файлын төгсгөл;
+        output_file өгөөгүй бол None
+    """
+    spec, _, output_file = text.partition('=')
+    if ':' not in spec:
+        raise ValueError(f"'{text}': start:end хэлбэртэй байх ёстой")
+    start_text, end_text = spec.split(':', 1)
+
+    def to_frame(value, default):
+        value = value.strip()
+        if not value:
+            return default
+        if value.lower().endswith('f'):
+            return int(value[:-1])
+        return int(float(value) / frame_time)
+
+    start = to_frame(start_text, 0)
+    end = to_frame(end_text, None)
+    return start, end, output_file or None
+
+
+def _remove_outputs(paths):
+    """Дуусаагүй гаралтын файлуудыг устгах"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cut_bvh_ranges(input_file, ranges, chunk_frames=4096, buffer_size=1 << 22):
+    """
+    Эх файлыг нэг удаа уншиж олон мужийг тус тусын файлд бичих
+
+    Frame мөрүүдийг chunk_frames-ээр багцалж, муж бүрт багц доторх хэсгийг
+    нэг write-аар бичнэ. Хэдэн ч муж байсан эх файлыг нэг л дамжина.
+
+    Parameters:
+    -----------
+    ranges : list of (start, end, output_file)
+        0-ээс эхэлсэн frame индекс, end орохгүй (None = файлын төгсгөл)
+    buffer_size : int
+        Гаралтын файл бүрийн write buffer (byte)
+
+    Returns:
+    --------
+    list of (output_file, frames) : бичсэн файлууд
+    """
+    with BVHReader(input_file) as reader:
+        total_frames = reader.num_frames
+        header = ''.join(reader.header_lines)
+
+        pending = []
+        for start, end, output_file in ranges:
+            stop = total_frames if end is None else min(end, total_frames)
+            if start < 0 or start >= stop:
+                print(f"⚠️  {output_file}: хоосон муж ({start}:{end}, нийт {total_frames} frame)")
+                continue
+            end = stop
+            pending.append((start, end, output_file))
+        # Эхлэлээр эрэмбэлж дараалан нээнэ
+        pending.sort(key=lambda r: r[0], reverse=True)
+
+        written = []
+        active = []
+        lines = reader.iter_frame_lines()
+        position = 0
+        try:
+            with ExitStack() as stack:
+                while pending or active:
+                    batch = list(islice(lines, chunk_frames))
+                    if not batch:
+                        break
+                    batch_end = position + len(batch)
+
+                    while pending and pending[-1][0] < batch_end:
+                        start, end, output_file = pending.pop()
+                        f = stack.enter_context(open(output_file, 'w', buffering=buffer_size))
+                        active.append((start, end, output_file, f))
+                        f.write(header + f"Frames: {end - start}\n" + reader.frame_time_line)
+
+                    for start, end, _, f in active:
+                        a = max(start, position) - position
+                        b = min(end, batch_end) - position
+                        if a < b:
+                            f.write(''.join(batch[a:b]))
+
+                    still_active = []
+                    for item in active:
+                        if item[1] <= batch_end:
+                            item[3].close()
+                            written.append((item[2], item[1] - item[0]))
+                        else:
+                            still_active.append(item)
+                    active = still_active
+                    position = batch_end
+        except BaseException:
+            # Дуусаагүй гаралтыг үлдээхгүй
+            _remove_outputs(output_file for _, _, output_file, _ in active)
+            raise
+
+        # Эх файл толгойд зарласнаас эрт дууссан: Frames мөр нь бодит тооноос
+        # их байх тул дуусаагүй гаралтыг устгаж, мужийг бичигдээгүйд тооцно
+        _remove_outputs(output_file for _, _, output_file, _ in active)
+        for start, end, output_file in [item[:3] for item in active] + pending:
+            print(f"⚠️  {output_file}: эх файл {position} frame-д дууссан "
+                  f"(толгойд {total_frames}, муж {start}:{end})")
+    return written
+
 
 def cut_bvh_file(input_file, output_file, duration_seconds=180):
     """
     BVH файлыг тодорхой хугацаагаар таслах
-    
+
     Args:
         input_file: Оролтын BVH файл
         output_file: Гаралтын BVH файл
         duration_seconds: Таслах хугацаа (секундээр)
+
+    Returns:
+        bool: Файл үүсгэсэн эсэх
     """
     print(f"BVH файл уншиж байна: {input_file}")
-    
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
-    
-    # Find MOTION section
-    motion_line_idx = None
-    frames_line_idx = None
-    frame_time_line_idx = None
-    data_start_idx = None
-    
-    for i, line in enumerate(lines):
-        if line.strip() == 'MOTION':
-            motion_line_idx = i
-        elif line.strip().startswith('Frames:'):
-            frames_line_idx = i
-            total_frames = int(line.split(':')[1].strip())
-        elif line.strip().startswith('Frame Time:'):
-            frame_time_line_idx = i
-            frame_time = float(line.split(':')[1].strip())
-            data_start_idx = i + 1
-            break
-    
-    if motion_line_idx is None or frames_line_idx is None:
+
+    # Find MOTION section (зөвхөн толгойг уншина, frame-үүдийг урсгалаар)
+    try:
+        reader = BVHReader(input_file)
+    except ValueError:
         print("Алдаа: BVH форматыг уншиж чадсангүй!")
-        return
-    
+        return False
+
+    with reader:
+        total_frames = reader.num_frames
+        frame_time = reader.frame_time
+
     # Calculate number of frames to keep
     frames_to_keep = int(duration_seconds / frame_time)
     frames_to_keep = min(frames_to_keep, total_frames)
-    
+
     print(f"Нийт frames: {total_frames}")
     print(f"Frame time: {frame_time} сек")
     print(f"Нийт хугацаа: {total_frames * frame_time:.2f} сек")
     print(f"Таслах хугацаа: {duration_seconds} сек")
     print(f"Хадгалах frames: {frames_to_keep}")
     print(f"Шинэ хугацаа: {frames_to_keep * frame_time:.2f} сек")
-    
-    # Create output content
-    output_lines = []
-    
-    # Copy hierarchy section
-    for i in range(motion_line_idx + 1):
-        output_lines.append(lines[i])
-    
-    # Add motion header
-    output_lines.append(f"Frames:    {frames_to_keep}\n")
-    output_lines.append(f"Frame Time:    {frame_time}\n")
-    
-    # Add motion data (only first N frames)
-    for i in range(data_start_idx, data_start_idx + frames_to_keep):
-        if i < len(lines):
-            output_lines.append(lines[i])
-    
+
     # Write output file
     print(f"Шинэ файл үүсгэж байна: {output_file}")
-    with open(output_file, 'w') as f:
-        f.writelines(output_lines)
-    
+    if not cut_bvh_ranges(input_file, [(0, frames_to_keep, output_file)]):
+        print(f"Алдаа: {output_file} үүсгэсэнгүй (хадгалах frame байхгүй эсвэл эх файл дутуу)")
+        return False
+
     print(f"Амжилттай! {output_file} файл үүсгэгдлээ.")
+    return True
 
 # Usage
 if __name__ == "__main__":
-    # Find .bvh file in current directory
-    bvh_files = [f for f in os.listdir('.') if f.endswith('.bvh')]
-    
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
-    elif bvh_files:
+    arg_parser = argparse.ArgumentParser(
+        description="BVH файлаас нэг эсвэл олон хэсгийг нэг уншилтаар таслах",
+        epilog="Жишээ: python cut_bvh.py master.bvh -r 0:60=tasalsan60.bvh "
+               "-r 0:180=tasalsan180.bvh -r 1200f:4800f")
+    arg_parser.add_argument("input", nargs="?", default=None,
+                            help="Оролтын BVH файл (default: хавтас дахь эхний .bvh)")
+    arg_parser.add_argument("output", nargs="?", default="tasalsan180.bvh",
+                            help="-r өгөөгүй үед гаралтын файл")
+    arg_parser.add_argument("duration", nargs="?", type=float, default=180,
+                            help="-r өгөөгүй үед эхнээс нь хадгалах секунд")
+    arg_parser.add_argument("-r", "--range", action="append", default=[], dest="ranges",
+                            metavar="START:END[=OUTPUT]",
+                            help="Секунд эсвэл 'f' дагавартай frame. Олон удаа өгч болно")
+    arg_parser.add_argument("-d", "--output-dir", default=".",
+                            help="Нэр заагаагүй мужуудын гаралтын хавтас")
+    args = arg_parser.parse_args()
+
+    input_file = args.input
+    if input_file is None:
+        # Find .bvh file in current directory
+        bvh_files = sorted(f for f in os.listdir('.') if f.endswith('.bvh'))
+        if not bvh_files:
+            print("Алдаа: .bvh файл олдсонгүй!")
+            arg_parser.print_help()
+            sys.exit(1)
         input_file = bvh_files[0]
         print(f"Файл ашиглаж байна: {input_file}")
-    else:
-        print("Алдаа: .bvh файл олдсонгүй!")
-        print("Хэрэглэх арга:")
-        print("  python cut_bvh.py input.bvh")
-        print("  python cut_bvh.py input.bvh output.bvh 15")
-        sys.exit(1)
-    
-    # Output file name
-    if len(sys.argv) > 2:
-        output_file = sys.argv[2]
-    else:
-        output_file = "tasalsan180.bvh"
-    
-    # Duration in seconds
-    if len(sys.argv) > 3:
-        duration = float(sys.argv[3])
-    else:
-        duration = 180
-    
+
     if not os.path.exists(input_file):
         print(f"Алдаа: {input_file} файл олдсонгүй!")
         sys.exit(1)
-    
-    cut_bvh_file(input_file, output_file, duration)
\ No newline at end of file
+
+    if not args.ranges:
+        ok = cut_bvh_file(input_file, args.output, args.duration)
+        sys.exit(0 if ok else 1)
+
+    with BVHReader(input_file) as reader:
+        frame_time = reader.frame_time
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    ranges = []
+    for text in args.ranges:
+        try:
+            start, end, output_file = parse_range(text, frame_time)
+        except ValueError as e:
+            print(f"Алдаа: {e}")
+            sys.exit(1)
+        if output_file is None:
+            end_label = 'end' if end is None else end
+            output_file = os.path.join(args.output_dir, f"{stem}_{start}-{end_label}.bvh")
+        ranges.append((start, end, output_file))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    written = cut_bvh_ranges(input_file, ranges)
+    for output_file, frames in written:
+        print(f"✅ {output_file}: {frames} frame ({frames * frame_time:.2f} сек)")
+    if len(written) < len(ranges):
+        print(f"Алдаа: {len(ranges) - len(written)}/{len(ranges)} муж үүсгэсэнгүй")
+        sys.exit(1)
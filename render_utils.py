@@ -0,0 +1,433 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.collections import PathCollection
+from matplotlib.text import Text
+from mpl_toolkits.mplot3d.art3d import Line3DCollection, Path3DCollection
+
+
+def figure_to_rgb(fig):
+    """Зурсан figure-ийн canvas-ийг (height, width, 3) uint8 зураг болгох"""
+    image = np.frombuffer(fig.canvas.buffer_rgba(), dtype='uint8')
+    image = image.reshape(fig.canvas.get_width_height()[::-1] + (4,))
+    return image[:, :, :3].copy()  # Remove alpha channel
+
+
+def open_video_writer(output_file, fps):
+    """
+    Frame-үүдийг нэг нэгээр нь бичих imageio writer нээх
+
+    Зургуудыг санах ойд цуглуулахгүй, append_data() бүрт шууд encoder руу
+    (ffmpeg pipe) дамжуулна. MP4 бичих backend байхгүй бол өмнөх шигээ GIF
+    руу шилжинэ.
+
+    Returns:
+    --------
+    (writer, path) : writer-ийг with блокоор хаана, path нь бодит гаралтын файл
+    """
+    import imageio
+
+    try:
+        return imageio.get_writer(output_file, fps=fps), output_file
+    except ValueError:
+        # Fallback to GIF if MP4 not supported
+        gif_file = output_file.replace('.mp4', '.gif')
+        print(f"MP4 дэмжигдэхгүй байна. GIF үүсгэж байна: {gif_file}")
+        return imageio.get_writer(gif_file, fps=fps, loop=0), gif_file
+
+
+class FigureRenderer:
+    """
+    Figure/Axes3D-г нэг удаа үүсгэж frame бүрт зөвхөн artist-ийн өгөгдлийг шинэчлэх
+
+    Тэнхлэг, хязгаар, харагдацыг эхэнд нэг удаа тохируулна. blit=True үед
+    статик дэвсгэрийг (pane, grid, label) нэг удаа зурж хадгалаад frame бүрт
+    зөвхөн хөдөлгөөнт artist-уудыг дээр нь зурна.
+
+    Subclass нь setup_artists() ба update_artists() -г тодорхойлно.
+    BVH-ийн Y (өндөр) тэнхлэгийг plot-ийн Z тэнхлэгт харуулна.
+
+    backend:
+        'matplotlib' - artist-уудыг matplotlib-аар зурна (жишиг)
+        'raster' - дэвсгэр, камерыг matplotlib-аас нэг удаа авч artist-уудыг
+                   RasterCanvas-аар NumPy framebuffer руу шууд зурна
+    """
+
+    figsize = (10, 8)
+    facecolor = 'white'
+
+    def __init__(self, xlim, ylim, zlim, connections=(), blit=True, backend='matplotlib'):
+        if backend not in ('matplotlib', 'raster'):
+            raise ValueError(f"Үл мэдэгдэх backend: {backend}")
+        self.backend = backend
+        self.connections = np.asarray(connections, dtype=np.intp).reshape(-1, 2)
+
+        self.fig = plt.figure(figsize=self.figsize, facecolor=self.facecolor)
+        self.ax = self.fig.add_subplot(111, projection='3d', facecolor=self.facecolor)
+        self.ax.set_xlim(xlim)
+        self.ax.set_ylim(zlim)
+        self.ax.set_zlim(ylim)
+        self.ax.view_init(elev=10, azim=90)
+        self.style_axes(self.ax)
+
+        self.artists = self.setup_artists(self.ax)
+        self.blit = blit and hasattr(self.fig.canvas, 'copy_from_bbox')
+        # raster үед хөдөлгөөнт artist-ууд дэвсгэрт орохгүй байх ёстой
+        for artist in self.artists:
+            artist.set_animated(self.blit or backend == 'raster')
+        self._background = None
+        self._raster = None
+
+    def style_axes(self, ax):
+        """Тэнхлэгийн label, grid зэрэг статик тохиргоо"""
+
+    def setup_artists(self, ax):
+        """Хөдөлгөөнт artist-уудыг үүсгэж жагсаалтаар буцаана"""
+        raise NotImplementedError
+
+    def update_artists(self, points, title):
+        """(joints, 3) цэгүүдээр artist-уудын өгөгдлийг шинэчлэх"""
+        raise NotImplementedError
+
+    def reseed(self, key):
+        """
+        Chunk бүрийн өмнө дуудагдана. Санамсаргүй өгөгдөлтэй renderer нь
+        үүгээр зураг worker-ийн тооноос үл хамааран давтагдахыг хангана.
+        """
+
+    def render(self, points, title=''):
+        """Нэг frame зурж (height, width, 3) uint8 зураг буцаах"""
+        self.update_artists(points, title)
+        if self.backend == 'raster':
+            try:
+                if self._raster is None:
+                    self._raster = RasterCanvas(self.fig, self.ax)
+                return self._raster.render(self.artists)
+            except RasterUnsupported as e:
+                print(f"⚠️  raster backend ажиллахгүй ({e}), matplotlib-аар үргэлжлүүлнэ")
+                self.backend = 'matplotlib'
+                for artist in self.artists:
+                    artist.set_animated(self.blit)
+
+        canvas = self.fig.canvas
+        if not self.blit:
+            canvas.draw()
+            return figure_to_rgb(self.fig)
+
+        if self._background is None:
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+        canvas.restore_region(self._background)
+        for artist in self.artists:
+            if hasattr(artist, 'do_3d_projection'):
+                artist.do_3d_projection()
+            self.ax.draw_artist(artist)
+        return figure_to_rgb(self.fig)
+
+    def close(self):
+        plt.close(self.fig)
+
+
+# ===== NumPy rasterizer =====
+
+class RasterUnsupported(Exception):
+    """Энэ matplotlib хувилбараас artist-ийн өгөгдлийг авч чадахгүй"""
+
+
+def _artist_3d(artist, name):
+    """
+    Artist-ийн 3D өгөгдөл
+
+    Line3DCollection/Path3DCollection-ийн get_segments()/get_offsets() нь
+    проекцолсон 2D утга буцаадаг тул 3D өгөгдлийн public getter байхгүй.
+    Хувилбарт энэ attribute байхгүй бол RasterUnsupported (renderer нь
+    matplotlib backend руу шилжинэ).
+    """
+    try:
+        return getattr(artist, name)
+    except AttributeError:
+        raise RasterUnsupported(f"{type(artist).__name__}.{name} байхгүй") from None
+
+
+class RasterCanvas:
+    """
+    Axes3D-ийн камер ба дэвсгэрийг ашиглан artist-уудыг NumPy-аар зурах
+
+    Эхэнд figure-г нэг удаа бүрэн зурж (animated artist-уудгүй) дэвсгэрийг
+    хадгалаад, Axes3D-ийн проекцын матриц (view_init, хязгаар, box aspect)
+    ба transData-г авна. Дараа нь frame бүрт:
+
+    - Line3DCollection: ясыг butt үзүүртэй, өргөнтэй шулуун хэрчим болгон
+      антиалиас coverage-тэйгээр
+    - Path3DCollection (scatter, 'o'): тойрог цэг, depthshade-ийг оролцуулан
+    - Text (гарчиг): зөвхөн текстийг тусдаа RendererAgg дээр
+
+    framebuffer руу alpha blending-ээр (over) зурна. Нэг artist доторх
+    элементүүд нэг өнгөтэй гэж үзэх тул давхцлын дараалал үр дүнд нөлөөлөхгүй
+    (dst = c + (dst - c) * Π(1 - a_i)) бөгөөд z-ээр эрэмбэлэх шаардлагагүй.
+    """
+
+    def __init__(self, fig, ax):
+        # Эхний draw-ийн do_3d_projection нь scatter-ийн хэмжээ, зузааныг
+        # тухайн frame-ийн z-ээр эрэмбэлж, 3D өнгөний getter-уудыг сүүдэрлэдэг.
+        # Иймд хэмжээ, зузааныг хадгалж сэргээнэ. edgecolors='face' үед
+        # get_edgecolor() нь энэ сүүдэрлэсэн get_facecolor()-ийг буцаах тул
+        # draw-аас өмнө (хоёр getter адил үед) хүрээ нүүрнийхээ өнгийг дагах
+        # эсэхийг тэмдэглэж, зурахдаа сүүдэрлээгүй нүүрний өнгийг авна.
+        scatters = [c for c in ax.collections if isinstance(c, Path3DCollection)]
+        saved = [(c, c.get_sizes().copy(), c.get_linewidth().copy()) for c in scatters]
+        self._edge_is_face = {c: np.array_equal(c.get_edgecolor(), c.get_facecolor())
+                              for c in scatters}
+        fig.canvas.draw()
+        for c, sizes, linewidths in saved:
+            c.set_sizes(sizes)
+            c.set_linewidth(linewidths)
+        self.background = figure_to_rgb(fig)
+        self.height, self.width = self.background.shape[:2]
+        self.dpi = fig.dpi
+        self.ax = ax
+        # data -> проекцын (vx, vy, vz) ба (vx, vy) -> display пиксел
+        self.proj = np.array(ax.get_proj(), dtype=float)
+        self.display = ax.transData.get_affine().get_matrix()
+        self._text_renderer = None
+
+    def project(self, xyz):
+        """
+        (n, 3) plot координатыг проекцлох
+
+        Returns:
+        --------
+        pixels : (n, 2) зургийн (багана, мөр) координат, пикселийн төв нь i + 0.5
+        view : (n, 3) matplotlib-ийн проекцын (vx, vy, vz) координат
+        """
+        xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+        vec = xyz @ self.proj[:3, :3].T + self.proj[:3, 3]
+        w = xyz @ self.proj[3, :3] + self.proj[3, 3]
+        view = vec / w[:, np.newaxis]
+        disp = view[:, :2] @ self.display[:2, :2].T + self.display[:2, 2]
+        pixels = np.column_stack([disp[:, 0], self.height - disp[:, 1]])
+        return pixels, view
+
+    def render(self, artists):
+        """Artist-уудыг дэвсгэр дээр дарааллаар нь зурж uint8 зураг буцаах"""
+        fb = self.background.copy()
+        for artist in artists:
+            if not artist.get_visible():
+                continue
+            if isinstance(artist, Line3DCollection):
+                self._draw_lines(fb, artist)
+            elif isinstance(artist, Path3DCollection):
+                self._draw_scatter(fb, artist)
+            elif isinstance(artist, Text):
+                self._draw_text(fb, artist)
+        return fb
+
+    def _blend(self, fb, rows, cols, alpha, rgb):
+        """Нэг өнгийн давхаргыг пиксел бүрийн coverage*alpha-аар over хийх"""
+        keep = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width) & (alpha > 0)
+        if not keep.any():
+            return
+        rows, cols, alpha = rows[keep], cols[keep], alpha[keep]
+
+        # Зөвхөн хөндөгдсөн тэгш өнцөгт муж дотор пиксел бүрийн Π(1 - a_i)
+        r0, c0 = rows.min(), cols.min()
+        r1, c1 = rows.max() + 1, cols.max() + 1
+        flat = (rows - r0) * (c1 - c0) + (cols - c0)
+        with np.errstate(divide='ignore'):
+            log_t = np.log1p(-np.minimum(alpha, 1.0))
+        log_t = np.bincount(flat, weights=log_t, minlength=(r1 - r0) * (c1 - c0))
+        touched = np.flatnonzero(log_t)
+
+        region = fb[r0:r1, c0:c1].reshape(-1, 3)
+        color = np.asarray(rgb, dtype=np.float32) * 255
+        blended = color + (region[touched] - color) * np.exp(log_t[touched])[:, np.newaxis]
+        region[touched] = np.rint(blended)
+        fb[r0:r1, c0:c1] = region.reshape(r1 - r0, c1 - c0, 3)
+
+    def _draw_lines(self, fb, artist):
+        segments = np.asarray(_artist_3d(artist, '_segments3d'), dtype=float).reshape(-1, 2, 3)
+        if not len(segments):
+            return
+        colors = artist.get_edgecolor()
+        width = np.broadcast_to(artist.get_linewidth(), len(segments)) * self.dpi / 72
+        pixels, _ = self.project(segments.reshape(-1, 3))
+        a, b = pixels[0::2], pixels[1::2]
+
+        # Хэрчим бүрийн эргэн тойрны пикселүүд (bounding box)
+        pad = width / 2 + 1
+        lo = np.floor(np.minimum(a, b) - pad[:, np.newaxis]).astype(np.intp)
+        hi = np.ceil(np.maximum(a, b) + pad[:, np.newaxis]).astype(np.intp)
+        size = hi - lo
+        counts = size[:, 0] * size[:, 1]
+        seg = np.repeat(np.arange(len(segments)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cols = lo[seg, 0] + local % size[seg, 0]
+        rows = lo[seg, 1] + local // size[seg, 0]
+
+        # Хэрчмийн тэнхлэгийн дагуух (t) ба перпендикуляр зай
+        d = b - a
+        length = np.hypot(d[:, 0], d[:, 1])
+        u = d / np.maximum(length, 1e-12)[:, np.newaxis]
+        px = cols + 0.5 - a[seg, 0]
+        py = rows + 0.5 - a[seg, 1]
+        t = px * u[seg, 0] + py * u[seg, 1]
+        perp = np.abs(px * u[seg, 1] - py * u[seg, 0])
+        coverage = (np.clip(width[seg] / 2 + 0.5 - perp, 0, 1)
+                    * np.clip(t + 0.5, 0, 1) * np.clip(length[seg] - t + 0.5, 0, 1))
+        coverage[length[seg] == 0] = 0
+
+        alpha = np.broadcast_to(colors[:, 3], len(segments))
+        self._blend(fb, rows, cols, coverage * alpha[seg], colors[0, :3])
+
+    def _draw_scatter(self, fb, artist):
+        xs, ys, zs = (np.asarray(v, dtype=float).ravel()
+                      for v in _artist_3d(artist, '_offsets3d'))
+        if not len(xs):
+            return
+        pixels, view = self.project(np.column_stack([xs, ys, zs]))
+        colors = PathCollection.get_facecolor(artist)
+        if self._edge_is_face.get(artist):
+            edge_colors = colors
+        else:
+            edge_colors = PathCollection.get_edgecolor(artist)
+
+        shade = np.ones(len(xs))
+        if artist.get_depthshade():
+            # Axes3D-ийн depthshade: алсын цэгүүд илүү тунгалаг
+            scale = np.sqrt((np.ptp(view, axis=0) ** 2).sum())
+            if scale > 0:
+                shade = np.clip(1 - (view[:, 2] - view[:, 2].min()) / scale,
+                                getattr(artist, '_depthshade_minalpha', 0.3), 1)
+            # matplotlib (жишиг backend) нь alpha өгсөн scatter-ийн сүүдэрлэсэн
+            # alpha-г artist-ийн alpha-аар дахин үржүүлдэг
+            if artist.get_alpha() is not None:
+                shade = shade * artist.get_alpha()
+
+        # 'o' marker: s нь point^2 тул радиус = sqrt(s) / 2 point.
+        # Хүрээ (edgecolors='face' үед нүүрний өнгөтэй) нь радиус дээр
+        # төвлөрсөн linewidth өргөнтэй цагираг.
+        px = self.dpi / 72
+        # __init__ нь эхний draw-ийн дараа сэргээсэн тул get_sizes() z-ээр эрэмбэлэгдээгүй
+        radius = np.broadcast_to(np.sqrt(artist.get_sizes()) / 2 * px, len(xs))
+        edge = np.broadcast_to(artist.get_linewidth(), len(xs)) * px / 2
+        if not len(edge_colors):
+            edge = np.zeros(len(xs))
+
+        k = int(np.ceil((radius + edge).max() + 0.5))
+        grid = np.arange(-k, k + 1)
+        dx, dy = (g.ravel() for g in np.meshgrid(grid, grid))
+        base = np.floor(pixels).astype(np.intp)
+        cols = base[:, 0, np.newaxis] + dx
+        rows = base[:, 1, np.newaxis] + dy
+        dist = np.hypot(cols + 0.5 - pixels[:, 0, np.newaxis], rows + 0.5 - pixels[:, 1, np.newaxis])
+        radius, edge = radius[:, np.newaxis], edge[:, np.newaxis]
+
+        fill = np.clip(radius + 0.5 - dist, 0, 1)
+        alpha = np.broadcast_to(colors[:, 3], len(xs)) * shade
+        self._blend(fb, rows.ravel(), cols.ravel(), (fill * alpha[:, np.newaxis]).ravel(),
+                    colors[0, :3])
+        if edge.any():
+            ring = (np.clip(radius + edge + 0.5 - dist, 0, 1)
+                    - np.clip(radius - edge + 0.5 - dist, 0, 1))
+            alpha = np.broadcast_to(edge_colors[:, 3], len(xs)) * shade
+            self._blend(fb, rows.ravel(), cols.ravel(), (ring * alpha[:, np.newaxis]).ravel(),
+                        edge_colors[0, :3])
+
+    def _draw_text(self, fb, artist):
+        if not artist.get_text():
+            return
+        if self._text_renderer is None:
+            self._text_renderer = RendererAgg(self.width, self.height, self.dpi)
+            # Гарчгийн байрлал тогтмол тул мөрийн мужийг нэг удаа олно
+            bbox = artist.get_window_extent(self._text_renderer)
+            self._text_rows = slice(max(self.height - int(np.ceil(bbox.y1)) - 4, 0),
+                                    min(self.height - int(np.floor(bbox.y0)) + 4, self.height))
+        renderer = self._text_renderer
+        renderer.clear()
+        artist.draw(renderer)
+
+        layer = np.asarray(renderer.buffer_rgba())[self._text_rows]
+        mask = layer[..., 3] > 0
+        alpha = layer[..., 3][mask, np.newaxis] / 255.0
+        region = fb[self._text_rows]
+        region[mask] = np.rint(layer[..., :3][mask] * alpha + region[mask] * (1 - alpha))
+
+
+# ===== Олон process-оор render хийх =====
+
+_worker_renderer = None
+
+
+def _init_render_worker(renderer_cls, renderer_kwargs):
+    global _worker_renderer
+    plt.switch_backend('Agg')
+    _worker_renderer = renderer_cls(**renderer_kwargs)
+
+
+def _render_chunk(key, chunk):
+    _worker_renderer.reseed(key)
+    return [_worker_renderer.render(points, title) for points, title in chunk]
+
+
+def _chunked(items, chunk_size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_frames(items, renderer_cls, renderer_kwargs, workers=1, chunk_size=4):
+    """
+    (points, title) хосуудыг зураг болгож эх дарааллаар нь yield хийх
+
+    workers > 1 үед frame-үүдийг chunk_size-аар хувааж process бүр өөрийн
+    Agg figure-ээр render хийнэ. Үр дүнг chunk-ийн дарааллаар буцаах ба
+    урьдчилан илгээх chunk-ийн тоог (2 * workers) хязгаарлаж санах ойг
+    тогтмол байлгана.
+
+    Parameters:
+    -----------
+    items : iterable of (points (joints, 3), title)
+    renderer_cls : FigureRenderer-ийн subclass
+    renderer_kwargs : dict
+        renderer_cls-д дамжуулах аргументууд (pickle хийгдэх ёстой)
+    workers : int
+        Process-ийн тоо (1 бол энэ process дотор, None бол CPU-ийн тоо)
+    chunk_size : int
+        Нэг даалгаварт илгээх frame-ийн тоо
+
+    Yields:
+    -------
+    np.ndarray : (height, width, 3) uint8 зураг
+    """
+    chunks = enumerate(_chunked(items, chunk_size))
+
+    if workers == 1:
+        renderer = renderer_cls(**renderer_kwargs)
+        try:
+            for key, chunk in chunks:
+                renderer.reseed(key)
+                for points, title in chunk:
+                    yield renderer.render(points, title)
+        finally:
+            renderer.close()
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                             initargs=(renderer_cls, renderer_kwargs)) as pool:
+        pending = deque()
+        for key, chunk in chunks:
+            pending.append(pool.submit(_render_chunk, key, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
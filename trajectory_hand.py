@@ -1,7 +1,13 @@
+import glob
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
+from bvh_fk import SkeletonPlan, forward_kinematics
+from bvh_io import BVHReader, load_cached_motion, save_cached_motion
+
 # -----------------------------
 # BVH Joint классын тодорхойлолт
 # -----------------------------
@@ -18,13 +24,25 @@ class Joint:
 # -----------------------------
 # BVH файл унших функц
 # -----------------------------
-def read_bvh(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
+def _read_motion(file_path, use_cache=True):
+    # Өмнө нь уншсан бол motion-г кэшээс memory-map хийнэ
+    cached = load_cached_motion(file_path) if use_cache else None
+    if cached is not None:
+        return cached
+    # Толгойг мөрөөр, motion-г нэг дор массив болгон урсгалаар унших
+    with BVHReader(file_path) as reader:
+        lines = reader.hierarchy_lines
+        frame_time = reader.frame_time
+        motion_data = reader.read_motion()
+    if use_cache:
+        save_cached_motion(file_path, lines, frame_time, motion_data)
+    return lines, frame_time, motion_data
+
+def read_bvh(file_path, use_cache=True):
+    lines, frame_time, motion_data = _read_motion(file_path, use_cache)
 
     joints = []
     stack = []
-    motion_index = 0
 
     i = 0
     while i < len(lines):
@@ -47,51 +65,81 @@ def read_bvh(file_path):
             i += 1  # '{'
             i += 1  # OFFSET
             i += 1  # '}'
+            i += 1  # End Site-ийн '}'-г эцэг joint-ийн хаалт гэж pop хийхгүй
         elif line == "}":
             if stack:
                 stack.pop()
             i += 1
-        elif line.startswith("MOTION"):
-            motion_index = i + 1
-            break
         else:
             i += 1
 
-    # --- Motion хэсгийг унших ---
-    frame_time_line = lines[motion_index + 1]
-    frame_time = float(frame_time_line.split(":")[1].strip())
-    motion_data = np.array(
-        [list(map(float, line.strip().split())) for line in lines[motion_index + 2:] if line.strip()]
-    )
-
     return joints, motion_data, frame_time
 
+def load_skeleton(file_path, use_cache=True):
+    """
+    BVH-ийг SkeletonPlan (End Site-уудтай) болон motion массив болгож унших
+
+    Returns: (plan, motion_data, frame_time)
+    """
+    lines, frame_time, motion_data = _read_motion(file_path, use_cache)
+    return SkeletonPlan.from_lines(lines), motion_data, frame_time
+
 # -----------------------------
 # Бугуйн траектори тооцох функц
 # -----------------------------
+def get_joint_trajectories(plan, motion_data, joint_names):
+    """
+    Олон joint-ийн world траекторийг бүх frame-д нэг дор тооцох
+
+    Зөвхөн хүссэн joint-уудын өвөг гинжийг (жишээ нь Hips → ... → LeftHand)
+    batched FK-аар тооцох тул хурууны бусад үе, хөл зэргийг алгасна.
+
+    Returns: (frames, len(joint_names), 3)
+    """
+    missing = [name for name in joint_names if name not in plan.index]
+    if missing:
+        raise ValueError(f"Joint {missing} not found! Available joints: {plan.names}")
+
+    return forward_kinematics(plan, motion_data, joints=joint_names)
+
 def get_joint_trajectory(joints, motion_data, joint_name):
     joint_names = [j.name for j in joints]
     if joint_name not in joint_names:
         raise ValueError(f"Joint '{joint_name}' not found! Available joints: {joint_names}")
 
-    # BVH файлын ROOT нь эхний 3 байрлал + 3 эргэлтийн channel-тэй байдаг
-    root_pos = motion_data[:, :3]
-    return root_pos
+    # Joint жагсаалт DFS дараалалтай тул шууд төлөвлөгөө болгоно
+    position = {id(j): i for i, j in enumerate(joints)}
+    plan = SkeletonPlan.from_joint_list([
+        (j.name, position[id(j.parent)] if j.parent else -1, j.offset, j.channels, False)
+        for j in joints])
+    return get_joint_trajectories(plan, motion_data, [joint_name])[:, 0]
+
+def collect_trajectories(folder, joint_names, use_cache=True):
+    """
+    Хавтсан дахь бүх BVH клипийн траекторууд
+
+    Returns: {файлын зам: (frames, len(joint_names), 3)}
+    """
+    trajectories = {}
+    for path in sorted(glob.glob(os.path.join(folder, '*.bvh'))):
+        plan, motion_data, _ = load_skeleton(path, use_cache)
+        trajectories[path] = get_joint_trajectories(plan, motion_data, joint_names)
+    return trajectories
 
 # -----------------------------
 # Гол код (Main)
 # -----------------------------
 if __name__ == "__main__":
     bvh_path = "DATA/vnuman_1c3.bvh"   # <-- Өөрийн BVH файлын замыг энд бичээрэй
-    joints, motion_data, frame_time = read_bvh(bvh_path)
+    plan, motion_data, frame_time = load_skeleton(bvh_path)
 
     # --- Гарны бугуйн нэрийг BVH файлд тааруулах ---
     LeftHand = "LeftHandThumb1"    # Зарим BVH-д "LeftWrist" эсвэл "LeftHandEnd" гэж байж болно
     RightHand = "RightHandThumb1"  # Түүнчлэн "RightWrist", "RightHandEnd" гэх мэт байж болно
 
     # --- Бугуйн траектори авах ---
-    left_traj = get_joint_trajectory(joints, motion_data, LeftHand)
-    right_traj = get_joint_trajectory(joints, motion_data, RightHand)
+    left_traj, right_traj = np.moveaxis(
+        get_joint_trajectories(plan, motion_data, [LeftHand, RightHand]), 1, 0)
 
     # -----------------------------
     # 3D Траектори дүрслэл
@@ -0,0 +1,166 @@
+import argparse
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+from matplotlib.collections import LineCollection
+
+from bvh_fk import forward_kinematics
+from bvh_io import BVHReader, load_cached_motion, save_cached_motion
+from bvh_resample import sample_positions
+
+
+def load_poses(bvh_path, fps=None):
+    """
+    Клипийн бүх pose-г batched FK-аар урьдчилан тооцох
+
+    fps өгвөл тэр давтамжийн цаг хугацааны цэгүүдэд хөрш frame-үүдийн
+    байрлалыг шугаманаар холино.
+
+    Returns:
+    --------
+    (positions (frames, joints, 3), connections (bones, 2), fps)
+    """
+    cached = load_cached_motion(bvh_path)
+    with BVHReader(bvh_path) as reader:
+        plan = reader.plan
+        clip_fps = reader.fps
+        if cached is not None:
+            motion = cached[2]
+        else:
+            motion = reader.read_motion()
+            save_cached_motion(bvh_path, reader.hierarchy_lines, reader.frame_time, motion)
+
+    positions = forward_kinematics(plan, np.asarray(motion, dtype=float))
+    if fps is not None and not np.isclose(fps, clip_fps):
+        i0, i1, w = sample_positions(len(positions), clip_fps, fps)
+        w = w[:, np.newaxis, np.newaxis]
+        positions = (1 - w) * positions[i0] + w * positions[i1]
+    else:
+        fps = clip_fps
+    return positions, np.asarray(plan.connections, dtype=np.intp).reshape(-1, 2), fps
+
+
+class SkeletonViewer:
+    """
+    Урьдчилан тооцсон pose-уудыг бодит хугацаанд тоглуулах
+
+    Ясны LineCollection, joint-уудын scatter, статус текстийг нэг удаа
+    үүсгэж frame бүрт зөвхөн өгөгдлийг нь шинэчилнэ (blit). Timer бүрт
+    ханын цагаас харуулах frame-ийг сонгодог тул зурах нь удаашрахад
+    тоглуулалт удаашрахгүй, харин алгассан frame-ийг drop гэж тоолно.
+
+    Товчлуур: space - түр зогсоох/үргэлжлүүлэх, q - хаах
+    """
+
+    def __init__(self, positions, connections, fps, title=''):
+        self.positions = positions
+        self.connections = connections
+        self.fps = fps
+        self.shown = 0
+        self.dropped = 0
+        self.paused = False
+        self._frame = 0
+        self._clock_start = None
+        self._last_tick = None
+        self._measured_fps = 0.0
+
+        # Урдаас харах: X хэвтээ, Y (өндөр) босоо. Бүх frame багтах хүрээ
+        lo = positions.reshape(-1, 3).min(axis=0)
+        hi = positions.reshape(-1, 3).max(axis=0)
+        self.setup_figure(lo, hi, title)
+
+    @classmethod
+    def from_file(cls, bvh_path, fps=None):
+        positions, connections, fps = load_poses(bvh_path, fps)
+        return cls(positions, connections, fps, title=bvh_path)
+
+    def setup_figure(self, lo, hi, title):
+        self.fig, self.ax = plt.subplots(figsize=(8, 12))
+        self.ax.set_facecolor('white')
+        self.ax.set_aspect('equal')
+        self.ax.axis('off')
+        self.ax.set_title(title)
+        self.set_limits(lo, hi)
+
+        self.bones = LineCollection(np.zeros((len(self.connections), 2, 2)),
+                                    colors='black', linewidths=2, animated=True)
+        self.ax.add_collection(self.bones)
+        self.joints = self.ax.scatter(np.zeros(0), np.zeros(0), s=20, color='black',
+                                      animated=True)
+        self.status = self.ax.text(0.02, 0.98, '', transform=self.ax.transAxes,
+                                   va='top', family='monospace', animated=True)
+        self.fig.canvas.mpl_connect('key_press_event', self._on_key)
+
+    def set_limits(self, lo, hi, margin=10):
+        self.ax.set_xlim(lo[0] - margin, hi[0] + margin)
+        self.ax.set_ylim(lo[1] - margin, hi[1] + margin)
+
+    def _on_key(self, event):
+        if event.key == ' ':
+            self.paused = not self.paused
+            # Зогссон хугацааг тоглуулалтад тооцохгүй
+            self._clock_start = None
+        elif event.key == 'q':
+            plt.close(self.fig)
+
+    def _next_frame(self):
+        """Ханын цагаар одоо харуулах ёстой frame-ийн индекс"""
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            dt = now - self._last_tick
+            if dt > 0:
+                self._measured_fps = 0.9 * self._measured_fps + 0.1 / dt
+        self._last_tick = now
+        if self.paused:
+            return self._frame
+
+        if self._clock_start is None:
+            self._clock_start = now - self._frame / self.fps
+        target = int((now - self._clock_start) * self.fps)
+        skipped = target - self._frame - 1
+        if self.shown and skipped > 0:
+            self.dropped += skipped
+        if target >= len(self.positions):
+            # Клипийн төгсгөлд эхнээс нь давтана
+            self._clock_start = now
+            target = 0
+        self._frame = target
+        return target
+
+    def update(self, _):
+        frame = self._next_frame()
+        points = self.positions[frame]
+        xy = points[:, :2]
+        self.bones.set_segments(xy[self.connections])
+        self.joints.set_offsets(xy)
+        self.status.set_text(f"frame {frame:>6}/{len(self.positions)}  "
+                             f"{self._measured_fps:5.1f}/{self.fps:.0f} fps  "
+                             f"dropped {self.dropped}")
+        self.shown += 1
+        return self.bones, self.joints, self.status
+
+    def show(self):
+        # interval-ийг зорилтот fps-ээр; хоцорвол _next_frame алгасна
+        self.anim = FuncAnimation(self.fig, self.update, interval=1000.0 / self.fps,
+                                  blit=True, cache_frame_data=False)
+        plt.show()
+        return self.dropped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BVH клипийг бодит хугацаанд тоглуулах")
+    parser.add_argument("bvh_file", nargs="?", default="DATA/vdolgion_1c1.bvh")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="Тоглуулах давтамж (default: клипийн fps)")
+    args = parser.parse_args()
+
+    print(f"📂 {args.bvh_file}: pose-уудыг тооцоолж байна...")
+    start = time.perf_counter()
+    viewer = SkeletonViewer.from_file(args.bvh_file, args.fps)
+    print(f"✅ {len(viewer.positions)} frame, {viewer.fps:.1f} fps "
+          f"({time.perf_counter() - start:.2f} сек)")
+
+    dropped = viewer.show()
+    print(f"Харуулсан: {viewer.shown} frame, алгассан: {dropped}")